@@ -0,0 +1,28 @@
+"""bot signal bitmask on click_events
+
+Revision ID: click_bot_signals_mask_014
+Revises: click_log_packed_payload_013
+Create Date: 2026-10-16
+
+The boolean bot signals move out of the bot_signals JSONB into one
+integer (bit n ↔ app.core.bot_detection.BOT_SIGNAL_BITS[n]). Constant
+default, so no table rewrite.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'click_bot_signals_mask_014'
+down_revision = 'click_log_packed_payload_013'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        'click_events',
+        sa.Column('bot_signals_mask', sa.Integer(), nullable=False, server_default='0'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('click_events', 'bot_signals_mask')
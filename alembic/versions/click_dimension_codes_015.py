@@ -0,0 +1,64 @@
+"""smallint dimension codes for click source/device columns
+
+Revision ID: click_dimension_codes_015
+Revises: click_bot_signals_mask_014
+Create Date: 2026-10-16
+
+source_platform, source_medium and device_class repeat a few dozen values
+across every click. Each gets a seeded *_dim table and a nullable smallint
+code column on click_events. The seed lists mirror
+app.core.referrer_intelligence and are append-only.
+
+New clicks write both the code and the text; the text columns stay
+because raw utm_source/utm_medium values have no code and the dashboard
+still groups on them. No backfill — nullable add, no table rewrite.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'click_dimension_codes_015'
+down_revision = 'click_bot_signals_mask_014'
+branch_labels = None
+depends_on = None
+
+SOURCE_PLATFORMS = (
+    "direct", "unknown", "unknown_external", "same_site", "same_origin",
+    "instagram", "tiktok", "youtube", "twitter", "facebook", "threads",
+    "snapchat", "linkedin", "pinterest", "reddit", "tumblr",
+    "telegram", "whatsapp", "discord", "wechat", "line", "sms",
+    "google", "bing", "yahoo", "duckduckgo", "baidu", "yandex",
+    "gmail", "outlook", "yahoo_mail", "aol_mail", "apple_mail", "protonmail",
+    "mailspring", "thunderbird", "email", "newsletter", "mailchimp",
+    "sendgrid", "klaviyo",
+    "linktree", "beacons", "stan_store", "hoobe", "snipfeed", "tapbio",
+    "campsite", "bitly", "tinyurl", "branch", "substack", "medium",
+    "hackernews", "producthunt",
+)
+SOURCE_MEDIUMS = ("direct", "social", "search", "email", "messaging", "paid", "referral", "internal")
+DEVICE_CLASSES = ("unknown", "mobile", "tablet", "desktop", "other")
+
+DIMENSIONS = (
+    ('source_platform_dim', 'source_platform_id', SOURCE_PLATFORMS),
+    ('source_medium_dim', 'source_medium_id', SOURCE_MEDIUMS),
+    ('device_class_dim', 'device_class_id', DEVICE_CLASSES),
+)
+
+
+def upgrade() -> None:
+    for table, column, names in DIMENSIONS:
+        dim = op.create_table(
+            table,
+            sa.Column('id', sa.SmallInteger(), primary_key=True, autoincrement=False),
+            sa.Column('name', sa.Text(), nullable=False, unique=True),
+        )
+        op.bulk_insert(dim, [{'id': i, 'name': name} for i, name in enumerate(names, 1)])
+        op.add_column(
+            'click_events',
+            sa.Column(column, sa.SmallInteger(), sa.ForeignKey(f'{table}.id'), nullable=True),
+        )
+
+
+def downgrade() -> None:
+    for table, column, _ in reversed(DIMENSIONS):
+        op.drop_column('click_events', column)
+        op.drop_table(table)
@@ -0,0 +1,25 @@
+"""packed payload column for click_events_log
+
+Revision ID: click_log_packed_payload_013
+Revises: links_org_listing_index_012
+Create Date: 2026-10-16
+
+server_received rows move from the JSONB payload to a compact bytea
+encoding (app.core.click_log) — no per-row key strings. Existing rows and
+other event types keep using payload.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'click_log_packed_payload_013'
+down_revision = 'links_org_listing_index_012'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('click_events_log', sa.Column('payload_packed', sa.LargeBinary(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('click_events_log', 'payload_packed')
@@ -0,0 +1,59 @@
+"""covering indexes for dashboard org + period scans
+
+Revision ID: dashboard_covering_indexes_011
+Revises: upsert_unique_keys_010
+Create Date: 2026-10-16
+
+Every dashboard query filters on (organization_id, created_at >= cutoff)
+and then counts/sums a handful of columns. INCLUDE-ing those columns lets
+Postgres answer the GROUP BYs with index-only scans. The covering index
+leads with the same (organization_id, created_at) key, so the old
+ix_click_events_org_created is dropped rather than maintained on every click.
+
+Built CONCURRENTLY so the event tables stay writable during the migration.
+"""
+import sqlalchemy as sa
+from alembic import op
+
+revision = 'dashboard_covering_indexes_011'
+down_revision = 'upsert_unique_keys_010'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_click_events_org_created_cover', 'click_events',
+            ['organization_id', sa.text('created_at DESC')],
+            postgresql_include=[
+                'source_platform', 'device_class', 'country_code',
+                'bot_blocked', 'creator_id', 'ip_address',
+            ],
+            postgresql_concurrently=True,
+        )
+        op.drop_index('ix_click_events_org_created', 'click_events', postgresql_concurrently=True)
+        op.create_index(
+            'ix_conversion_events_org_created_cover', 'conversion_events',
+            ['organization_id', 'created_at'],
+            postgresql_include=['revenue_cents', 'event_type', 'click_id'],
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            'ix_refund_events_org_created_cover', 'refund_events',
+            ['organization_id', 'created_at'],
+            postgresql_include=['refund_amount_cents', 'click_id'],
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_refund_events_org_created_cover', 'refund_events', postgresql_concurrently=True)
+        op.drop_index('ix_conversion_events_org_created_cover', 'conversion_events', postgresql_concurrently=True)
+        op.create_index(
+            'ix_click_events_org_created', 'click_events',
+            ['organization_id', 'created_at'],
+            postgresql_concurrently=True,
+        )
+        op.drop_index('ix_click_events_org_created_cover', 'click_events', postgresql_concurrently=True)
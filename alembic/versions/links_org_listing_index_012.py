@@ -0,0 +1,35 @@
+"""covering index for per-org link listing
+
+Revision ID: links_org_listing_index_012
+Revises: dashboard_covering_indexes_011
+Create Date: 2026-10-16
+
+list_links / dashboard_links filter on organization_id and order by
+created_at DESC (id DESC as tiebreaker for keyset pagination). The route
+columns are INCLUDE-d; destination_url is not, since unbounded Text can
+exceed the btree tuple size limit.
+
+Built CONCURRENTLY so links stay writable during the migration.
+"""
+import sqlalchemy as sa
+from alembic import op
+
+revision = 'links_org_listing_index_012'
+down_revision = 'dashboard_covering_indexes_011'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_links_org_created_cover', 'links',
+            ['organization_id', sa.text('created_at DESC'), sa.text('id DESC')],
+            postgresql_include=['creator_handle', 'campaign_slug', 'asset_slug', 'status'],
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_links_org_created_cover', 'links', postgresql_concurrently=True)
@@ -0,0 +1,79 @@
+"""unique keys for creator/campaign/link upserts
+
+Revision ID: upsert_unique_keys_010
+Revises: platform_connections_009
+Create Date: 2026-10-16
+
+INSERT ... ON CONFLICT needs a unique index to arbitrate against:
+  - creators.handle                       (was a plain index)
+  - campaigns (organization_id, slug)     (new)
+  - links (creator_handle, campaign_slug) WHERE asset_slug IS NULL
+    (ix_links_route_lookup treats NULL asset_slugs as distinct, so
+    two-segment routes need their own partial unique index)
+
+Existing duplicates would make the index builds fail halfway through, so
+they are checked for up front and the upgrade aborts listing them; resolve
+them by hand (they carry foreign keys) and re-run.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'upsert_unique_keys_010'
+down_revision = 'platform_connections_009'
+branch_labels = None
+depends_on = None
+
+
+# (unique key, duplicate-finding query) for each index this revision adds
+_DUPLICATE_CHECKS = (
+    ('creators.handle', """
+        SELECT handle, count(*) FROM creators
+        GROUP BY handle HAVING count(*) > 1
+    """),
+    ('campaigns (organization_id, slug)', """
+        SELECT organization_id || '/' || slug, count(*) FROM campaigns
+        GROUP BY organization_id, slug HAVING count(*) > 1
+    """),
+    ('links (creator_handle, campaign_slug) WHERE asset_slug IS NULL', """
+        SELECT creator_handle || '/' || campaign_slug, count(*) FROM links
+        WHERE asset_slug IS NULL
+        GROUP BY creator_handle, campaign_slug HAVING count(*) > 1
+    """),
+)
+
+
+def _assert_no_duplicates() -> None:
+    bind = op.get_bind()
+    problems = []
+    for key, query in _DUPLICATE_CHECKS:
+        rows = bind.execute(sa.text(query + " LIMIT 20")).all()
+        if rows:
+            listed = ", ".join(f"{value} (x{n})" for value, n in rows)
+            problems.append(f"{key}: {listed}")
+    if problems:
+        raise RuntimeError(
+            "Duplicate rows block the unique indexes in upsert_unique_keys_010 — "
+            "resolve them and re-run:\n  " + "\n  ".join(problems)
+        )
+
+
+def upgrade() -> None:
+    _assert_no_duplicates()
+    op.drop_index('ix_creators_handle', 'creators')
+    op.create_index('ix_creators_handle', 'creators', ['handle'], unique=True)
+    op.create_index(
+        'uq_campaigns_org_slug', 'campaigns',
+        ['organization_id', 'slug'], unique=True,
+    )
+    op.create_index(
+        'uq_links_route_no_asset', 'links',
+        ['creator_handle', 'campaign_slug'], unique=True,
+        postgresql_where='asset_slug IS NULL',
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('uq_links_route_no_asset', 'links')
+    op.drop_index('uq_campaigns_org_slug', 'campaigns')
+    op.drop_index('ix_creators_handle', 'creators')
+    op.create_index('ix_creators_handle', 'creators', ['handle'], unique=False)
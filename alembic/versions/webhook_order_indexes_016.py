@@ -0,0 +1,42 @@
+"""order-id indexes for Shopify webhook lookups
+
+Revision ID: webhook_order_indexes_016
+Revises: click_dimension_codes_015
+Create Date: 2026-10-16
+
+Both webhooks look rows up by order id, which had no index:
+  - conversion_events.order_id      orders-create idempotency check and
+    the refund webhook's original-conversion lookup (click_id and
+    organization_id INCLUDE-d so that one is index-only)
+  - refund_events.original_order_id the refund idempotency EXISTS
+
+Not unique: refunds without a Shopify refund id fall back to the order
+id, and the events API takes client-supplied order ids as-is.
+
+Built CONCURRENTLY so event writes continue during the migration.
+"""
+from alembic import op
+
+revision = 'webhook_order_indexes_016'
+down_revision = 'click_dimension_codes_015'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_conversion_events_order_id', 'conversion_events', ['order_id'],
+            postgresql_include=['click_id', 'organization_id'],
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            'ix_refund_events_original_order_id', 'refund_events', ['original_order_id'],
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_refund_events_original_order_id', 'refund_events', postgresql_concurrently=True)
+        op.drop_index('ix_conversion_events_order_id', 'conversion_events', postgresql_concurrently=True)
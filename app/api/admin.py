@@ -1,6 +1,8 @@
 """
 One-time admin bootstrap endpoint.
 Handles retries gracefully — won't fail if org already exists.
+
+Also GET /admin/db-pool — connection pool counters for sizing (secret key only).
 """
 
 from fastapi import APIRouter, Body, Depends, HTTPException
@@ -9,9 +11,9 @@ from sqlalchemy import select, text
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config import get_settings
-from app.models.database import get_db
+from app.models.database import get_db, pool_status
 from app.models.tables import Organization
-from app.middleware.auth import APIKey, generate_api_key
+from app.middleware.auth import APIKey, AuthContext, generate_api_key, require_secret_key
 
 import structlog
 
@@ -93,3 +95,9 @@ async def bootstrap(
         "secret_key": raw_secret,
         "publishable_key": raw_pub,
     }
+
+
+@router.get("/db-pool")
+async def db_pool(auth: AuthContext = Depends(require_secret_key)):
+    """Connection pool counters — kept off the public /health endpoint."""
+    return {"db_pool": pool_status()}
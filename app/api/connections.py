@@ -128,7 +128,6 @@ async def connect_paste_token(
         db.add(conn)
 
     await db.commit()
-    await db.refresh(conn)
     return conn
 
 # ── Toggle enable/disable ──────────────────────────────────────────────────
@@ -3,19 +3,26 @@ Dashboard API — Supabase-authenticated endpoints for the frontend.
 All queries scoped by auth.organization_id.
 """
 
+import asyncio
 import datetime
+from functools import partial
 from typing import Optional
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, Query
-from sqlalchemy import func, select, and_
+import structlog
+from cachetools import TTLCache
+from fastapi import APIRouter, BackgroundTasks, Depends, Query, Response
+from sqlalchemy import Text, and_, cast, func, select
+from sqlalchemy.dialects.postgresql import aggregate_order_by, insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.url_validate import validate_destination_url
 from app.middleware.supabase_auth import require_supabase_auth, SupabaseAuthContext
-from app.models.database import get_db
+from app.models.database import get_db, open_session
 from app.models.tables import ClickEvent, ConversionEvent, RefundEvent, Creator, Link, Organization
 from app.middleware.supabase_auth import User
 
+logger = structlog.get_logger()
 router = APIRouter(prefix="/v1/dashboard", tags=["dashboard"])
 
 
@@ -28,6 +35,15 @@ def _period_filter(org_id: str, days: int = 30):
     )
 
 
+async def _execute_concurrently(*stmts) -> list[list]:
+    """Run independent SELECTs in parallel, one pooled session each (a session can't multiplex)."""
+    async def _run(stmt):
+        async with open_session() as session:
+            return (await session.execute(stmt)).all()
+
+    return await asyncio.gather(*(_run(stmt) for stmt in stmts))
+
+
 def _prev_period_filter(org_id: str, days: int = 30):
     """Return a WHERE clause for the previous period (for pct change)."""
     now = datetime.datetime.now(datetime.timezone.utc)
@@ -40,35 +56,37 @@ def _prev_period_filter(org_id: str, days: int = 30):
     )
 
 
-@router.get("/summary")
-async def dashboard_summary(
-    auth: SupabaseAuthContext = Depends(require_supabase_auth),
-    db: AsyncSession = Depends(get_db),
-    days: int = Query(30, ge=1, le=365),
-):
-    """Total clicks, bots filtered, unique visitors, pct change vs previous period."""
-    current = _period_filter(auth.organization_id, days)
-    previous = _prev_period_filter(auth.organization_id, days)
+# ---------------------------------------------------------------------------
+# Overview tiles — cached per (tile, org, days) so the parallel tile requests
+# after login are hits once /me has prefetched them.
+# ---------------------------------------------------------------------------
+
+_tile_cache: TTLCache = TTLCache(maxsize=4096, ttl=60)
 
+
+async def _query_summary(db: AsyncSession, org_id: str, days: int, compare: bool = True) -> dict:
     cur_result = await db.execute(
         select(
             func.count(ClickEvent.id).label("total_clicks"),
             func.count(ClickEvent.id).filter(ClickEvent.bot_blocked == True).label("bots_filtered"),
             func.count(func.distinct(ClickEvent.ip_address)).label("unique_visitors"),
-        ).where(current)
+        ).where(_period_filter(org_id, days))
     )
     cur = cur_result.one()
 
-    prev_result = await db.execute(
-        select(func.count(ClickEvent.id).label("total_clicks")).where(previous)
-    )
-    prev_total = prev_result.scalar_one()
+    # Pollers pass compare=false — skip the previous-period scan entirely.
+    pct_change = None
+    if compare:
+        prev_result = await db.execute(
+            select(func.count(ClickEvent.id).label("total_clicks")).where(_prev_period_filter(org_id, days))
+        )
+        prev_total = prev_result.scalar_one()
 
-    pct_change = (
-        round((cur.total_clicks - prev_total) / prev_total * 100, 1)
-        if prev_total > 0
-        else None
-    )
+        pct_change = (
+            round((cur.total_clicks - prev_total) / prev_total * 100, 1)
+            if prev_total > 0
+            else None
+        )
 
     return {
         "total_clicks": cur.total_clicks,
@@ -79,57 +97,39 @@ async def dashboard_summary(
     }
 
 
-@router.get("/platforms")
-async def dashboard_platforms(
-    auth: SupabaseAuthContext = Depends(require_supabase_auth),
-    db: AsyncSession = Depends(get_db),
-    days: int = Query(30, ge=1, le=365),
-):
-    """Clicks grouped by source_platform."""
+async def _query_platforms(db: AsyncSession, org_id: str, days: int) -> list[dict]:
     result = await db.execute(
         select(
             ClickEvent.source_platform,
             func.count(ClickEvent.id).label("clicks"),
         )
-        .where(_period_filter(auth.organization_id, days))
+        .where(_period_filter(org_id, days))
         .group_by(ClickEvent.source_platform)
         .order_by(func.count(ClickEvent.id).desc())
     )
     return [{"platform": row.source_platform, "clicks": row.clicks} for row in result.all()]
 
 
-@router.get("/devices")
-async def dashboard_devices(
-    auth: SupabaseAuthContext = Depends(require_supabase_auth),
-    db: AsyncSession = Depends(get_db),
-    days: int = Query(30, ge=1, le=365),
-):
-    """Clicks grouped by device_class."""
+async def _query_devices(db: AsyncSession, org_id: str, days: int) -> list[dict]:
     result = await db.execute(
         select(
             ClickEvent.device_class,
             func.count(ClickEvent.id).label("clicks"),
         )
-        .where(_period_filter(auth.organization_id, days))
+        .where(_period_filter(org_id, days))
         .group_by(ClickEvent.device_class)
         .order_by(func.count(ClickEvent.id).desc())
     )
     return [{"device": row.device_class, "clicks": row.clicks} for row in result.all()]
 
 
-@router.get("/geo")
-async def dashboard_geo(
-    auth: SupabaseAuthContext = Depends(require_supabase_auth),
-    db: AsyncSession = Depends(get_db),
-    days: int = Query(30, ge=1, le=365),
-):
-    """Clicks grouped by country_code, top 10."""
+async def _query_geo(db: AsyncSession, org_id: str, days: int) -> list[dict]:
     result = await db.execute(
         select(
             ClickEvent.country_code,
             func.count(ClickEvent.id).label("clicks"),
         )
-        .where(_period_filter(auth.organization_id, days))
+        .where(_period_filter(org_id, days))
         .group_by(ClickEvent.country_code)
         .order_by(func.count(ClickEvent.id).desc())
         .limit(10)
@@ -137,6 +137,79 @@ async def dashboard_geo(
     return [{"country": row.country_code, "clicks": row.clicks} for row in result.all()]
 
 
+_TILE_QUERIES = {
+    "summary": _query_summary,
+    "summary_current": partial(_query_summary, compare=False),
+    "platforms": _query_platforms,
+    "devices": _query_devices,
+    "geo": _query_geo,
+}
+
+
+async def _cached_tile(tile: str, db: AsyncSession, org_id: str, days: int):
+    key = (tile, str(org_id), days)
+    cached = _tile_cache.get(key)
+    if cached is not None:
+        return cached
+    value = await _TILE_QUERIES[tile](db, org_id, days)
+    _tile_cache[key] = value
+    return value
+
+
+async def prefetch_dashboard(org_id: str, days: int = 30) -> None:
+    """Warm the tile cache for an org. Runs as a background task with its own session."""
+    try:
+        async with open_session() as db:
+            for tile, query in _TILE_QUERIES.items():
+                key = (tile, str(org_id), days)
+                if key not in _tile_cache:
+                    _tile_cache[key] = await query(db, org_id, days)
+    except Exception as e:
+        logger.warning("dashboard_prefetch_failed", org_id=str(org_id), error=str(e))
+
+
+@router.get("/summary")
+async def dashboard_summary(
+    auth: SupabaseAuthContext = Depends(require_supabase_auth),
+    db: AsyncSession = Depends(get_db),
+    days: int = Query(30, ge=1, le=365),
+    compare: bool = Query(True),
+):
+    """Total clicks, bots filtered, unique visitors, pct change vs previous period (if compare)."""
+    tile = "summary" if compare else "summary_current"
+    return await _cached_tile(tile, db, auth.organization_id, days)
+
+
+@router.get("/platforms")
+async def dashboard_platforms(
+    auth: SupabaseAuthContext = Depends(require_supabase_auth),
+    db: AsyncSession = Depends(get_db),
+    days: int = Query(30, ge=1, le=365),
+):
+    """Clicks grouped by source_platform."""
+    return await _cached_tile("platforms", db, auth.organization_id, days)
+
+
+@router.get("/devices")
+async def dashboard_devices(
+    auth: SupabaseAuthContext = Depends(require_supabase_auth),
+    db: AsyncSession = Depends(get_db),
+    days: int = Query(30, ge=1, le=365),
+):
+    """Clicks grouped by device_class."""
+    return await _cached_tile("devices", db, auth.organization_id, days)
+
+
+@router.get("/geo")
+async def dashboard_geo(
+    auth: SupabaseAuthContext = Depends(require_supabase_auth),
+    db: AsyncSession = Depends(get_db),
+    days: int = Query(30, ge=1, le=365),
+):
+    """Clicks grouped by country_code, top 10."""
+    return await _cached_tile("geo", db, auth.organization_id, days)
+
+
 @router.get("/clicks")
 async def dashboard_clicks(
     auth: SupabaseAuthContext = Depends(require_supabase_auth),
@@ -207,32 +280,23 @@ async def dashboard_clicks(
 @router.get("/conversions")
 async def dashboard_conversions(
     auth: SupabaseAuthContext = Depends(require_supabase_auth),
-    db: AsyncSession = Depends(get_db),
     days: int = Query(30, ge=1, le=365),
 ):
     """Conversion and refund KPIs: total conversions, revenue, refunds, net revenue, conversion rate."""
     cutoff = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=days)
     org_id = auth.organization_id
 
-    # Total clicks (for conversion rate)
-    clicks_result = await db.execute(
+    clicks_rows, conv_rows, by_type_rows, refund_rows = await _execute_concurrently(
+        # Total clicks (for conversion rate)
         select(func.count(ClickEvent.id))
-        .where(and_(ClickEvent.organization_id == org_id, ClickEvent.created_at >= cutoff))
-    )
-    total_clicks = clicks_result.scalar_one()
-
-    # Conversions
-    conv_result = await db.execute(
+        .where(and_(ClickEvent.organization_id == org_id, ClickEvent.created_at >= cutoff)),
+        # Conversions
         select(
             func.count(ConversionEvent.id).label("total_conversions"),
             func.coalesce(func.sum(ConversionEvent.revenue_cents), 0).label("total_revenue_cents"),
         )
-        .where(and_(ConversionEvent.organization_id == org_id, ConversionEvent.created_at >= cutoff))
-    )
-    conv = conv_result.one()
-
-    # Conversions by type
-    conv_by_type_result = await db.execute(
+        .where(and_(ConversionEvent.organization_id == org_id, ConversionEvent.created_at >= cutoff)),
+        # Conversions by type
         select(
             ConversionEvent.event_type,
             func.count(ConversionEvent.id).label("count"),
@@ -240,22 +304,21 @@ async def dashboard_conversions(
         )
         .where(and_(ConversionEvent.organization_id == org_id, ConversionEvent.created_at >= cutoff))
         .group_by(ConversionEvent.event_type)
-        .order_by(func.count(ConversionEvent.id).desc())
-    )
-    by_type = [
-        {"event_type": row.event_type, "count": row.count, "revenue_cents": row.revenue_cents}
-        for row in conv_by_type_result.all()
-    ]
-
-    # Refunds
-    refund_result = await db.execute(
+        .order_by(func.count(ConversionEvent.id).desc()),
+        # Refunds
         select(
             func.count(RefundEvent.id).label("total_refunds"),
             func.coalesce(func.sum(RefundEvent.refund_amount_cents), 0).label("total_refund_cents"),
         )
-        .where(and_(RefundEvent.organization_id == org_id, RefundEvent.created_at >= cutoff))
+        .where(and_(RefundEvent.organization_id == org_id, RefundEvent.created_at >= cutoff)),
     )
-    refund = refund_result.one()
+    total_clicks = clicks_rows[0][0]
+    conv = conv_rows[0]
+    refund = refund_rows[0]
+    by_type = [
+        {"event_type": row.event_type, "count": row.count, "revenue_cents": row.revenue_cents}
+        for row in by_type_rows
+    ]
 
     net_revenue_cents = conv.total_revenue_cents - refund.total_refund_cents
     conversion_rate = (
@@ -293,19 +356,15 @@ async def dashboard_creators(
     cutoff = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=days)
     org_id = auth.organization_id
 
-    # Clicks per creator
-    clicks_result = await db.execute(
+    clicks_rows, conv_rows, refund_rows = await _execute_concurrently(
+        # Clicks per creator
         select(
             ClickEvent.creator_id,
             func.count(ClickEvent.id).label("clicks"),
         )
         .where(and_(ClickEvent.organization_id == org_id, ClickEvent.created_at >= cutoff))
-        .group_by(ClickEvent.creator_id)
-    )
-    clicks_by_creator = {str(row.creator_id): row.clicks for row in clicks_result.all()}
-
-    # Conversions per creator (join via click_id)
-    conv_result = await db.execute(
+        .group_by(ClickEvent.creator_id),
+        # Conversions per creator (join via click_id)
         select(
             ClickEvent.creator_id,
             func.count(ConversionEvent.id).label("conversions"),
@@ -318,15 +377,8 @@ async def dashboard_creators(
             )
         )
         .where(and_(ConversionEvent.organization_id == org_id, ConversionEvent.created_at >= cutoff))
-        .group_by(ClickEvent.creator_id)
-    )
-    conv_by_creator = {
-        str(row.creator_id): {"conversions": row.conversions, "revenue_cents": row.revenue_cents}
-        for row in conv_result.all()
-    }
-
-    # Refunds per creator (join via click_id)
-    refund_result = await db.execute(
+        .group_by(ClickEvent.creator_id),
+        # Refunds per creator (join via click_id)
         select(
             ClickEvent.creator_id,
             func.count(RefundEvent.id).label("refunds"),
@@ -339,11 +391,16 @@ async def dashboard_creators(
             )
         )
         .where(and_(RefundEvent.organization_id == org_id, RefundEvent.created_at >= cutoff))
-        .group_by(ClickEvent.creator_id)
+        .group_by(ClickEvent.creator_id),
     )
+    clicks_by_creator = {str(row.creator_id): row.clicks for row in clicks_rows}
+    conv_by_creator = {
+        str(row.creator_id): {"conversions": row.conversions, "revenue_cents": row.revenue_cents}
+        for row in conv_rows
+    }
     refund_by_creator = {
         str(row.creator_id): {"refunds": row.refunds, "refund_cents": row.refund_cents}
-        for row in refund_result.all()
+        for row in refund_rows
     }
 
     # Get creator details
@@ -390,33 +447,33 @@ async def dashboard_links(
     auth: SupabaseAuthContext = Depends(require_supabase_auth),
     db: AsyncSession = Depends(get_db),
 ):
-    """All links for the org."""
-    result = await db.execute(
-        select(Link)
+    """All links for the org. Postgres builds the JSON array; we pass the text straight through."""
+    link_json = func.json_build_object(
+        "id", Link.id,
+        "creator_handle", Link.creator_handle,
+        "campaign_slug", Link.campaign_slug,
+        "asset_slug", Link.asset_slug,
+        "destination_url", Link.destination_url,
+        "status", Link.status,
+        "created_at", Link.created_at,
+    )
+    # Cast to text so asyncpg hands back the raw JSON instead of decoding it.
+    payload = await db.scalar(
+        select(cast(func.json_agg(aggregate_order_by(link_json, Link.created_at.desc())), Text))
         .where(Link.organization_id == auth.organization_id)
-        .order_by(Link.created_at.desc())
     )
-    links = result.scalars().all()
-    return [
-        {
-            "id": str(link.id),
-            "creator_handle": link.creator_handle,
-            "campaign_slug": link.campaign_slug,
-            "asset_slug": link.asset_slug,
-            "destination_url": link.destination_url,
-            "status": link.status,
-            "created_at": link.created_at.isoformat() if link.created_at else None,
-        }
-        for link in links
-    ]
+    return Response(content=payload or "[]", media_type="application/json")
 
 
 @router.get("/me")
 async def dashboard_me(
+    background_tasks: BackgroundTasks,
     auth: SupabaseAuthContext = Depends(require_supabase_auth),
     db: AsyncSession = Depends(get_db),
 ):
-    """User profile + org name."""
+    """User profile + org name. Also warms the overview tile cache for the default window."""
+    background_tasks.add_task(prefetch_dashboard, auth.organization_id)
+
     user_result = await db.execute(select(User).where(User.id == auth.user_id))
     user = user_result.scalar_one()
 
@@ -455,17 +512,6 @@ class CreateDashboardLinkRequest(BaseModel):
     asset_slug: str | None = None
 
 
-def _validate_destination_url(url: str):
-    """Prevent open redirect attacks."""
-    from fastapi import HTTPException
-    if not url.startswith(("https://", "http://")):
-        raise HTTPException(status_code=400, detail="destination_url must start with https:// or http://")
-    blocked = ["localhost", "127.0.0.1", "0.0.0.0", "169.254.", "10.", "192.168.", "172.16."]
-    for b in blocked:
-        if b in url.split("//")[1].split("/")[0]:
-            raise HTTPException(status_code=400, detail="destination_url cannot point to internal addresses")
-
-
 @router.post("/links")
 async def create_dashboard_link(
     req: CreateDashboardLinkRequest,
@@ -477,82 +523,69 @@ async def create_dashboard_link(
     from app.config import get_settings
 
     settings = get_settings()
-    _validate_destination_url(req.destination_url)
+    validate_destination_url(req.destination_url)
 
     org_id = auth.organization_id
 
-    # Find or create creator by handle within this org
-    creator_result = await db.execute(
-        select(Creator).where(Creator.handle == req.creator_handle)
+    # Find or create creator + campaign — one INSERT ... ON CONFLICT each.
+    # The no-op DO UPDATE makes RETURNING yield the id of an existing row too.
+    creator_stmt = (
+        pg_insert(Creator)
+        .values(id=uuid4(), handle=req.creator_handle, display_name=req.creator_handle)
+        .on_conflict_do_update(index_elements=["handle"], set_={"handle": Creator.handle})
+        .returning(Creator.id)
     )
-    creator = creator_result.scalar_one_or_none()
-    if not creator:
-        creator = Creator(
-            id=uuid4(),
-            handle=req.creator_handle,
-            display_name=req.creator_handle,
-        )
-        db.add(creator)
-        await db.flush()
+    creator_id = (await db.execute(creator_stmt)).scalar_one()
 
-    # Find or create campaign by slug within this org
     from app.models.tables import Campaign
-    campaign_result = await db.execute(
-        select(Campaign).where(
-            Campaign.slug == req.campaign_slug,
-            Campaign.organization_id == org_id,
+    campaign_stmt = (
+        pg_insert(Campaign)
+        .values(id=uuid4(), organization_id=org_id, name=req.campaign_slug, slug=req.campaign_slug)
+        .on_conflict_do_update(
+            index_elements=["organization_id", "slug"],
+            set_={"slug": Campaign.slug},
         )
+        .returning(Campaign.id)
     )
-    campaign = campaign_result.scalar_one_or_none()
-    if not campaign:
-        campaign = Campaign(
+    campaign_id = (await db.execute(campaign_stmt)).scalar_one()
+
+    # Duplicate route → unique index conflict → no row returned
+    link_stmt = (
+        pg_insert(Link)
+        .values(
             id=uuid4(),
             organization_id=org_id,
-            name=req.campaign_slug,
-            slug=req.campaign_slug,
-        )
-        db.add(campaign)
-        await db.flush()
-
-    # Check for duplicate route
-    dup_result = await db.execute(
-        select(Link).where(
-            Link.creator_handle == req.creator_handle,
-            Link.campaign_slug == req.campaign_slug,
-            Link.asset_slug == req.asset_slug,
+            creator_id=creator_id,
+            campaign_id=campaign_id,
+            creator_handle=req.creator_handle,
+            campaign_slug=req.campaign_slug,
+            asset_slug=req.asset_slug,
+            destination_url=req.destination_url,
+            source="member",
         )
+        .on_conflict_do_nothing()
+        .returning(Link.id, Link.status, Link.created_at)
     )
-    if dup_result.scalar_one_or_none():
+    link = (await db.execute(link_stmt)).one_or_none()
+    if link is None:
+        await db.rollback()
         from fastapi import HTTPException
         raise HTTPException(status_code=409, detail="A link with this creator/campaign/asset combination already exists")
 
-    link = Link(
-        id=uuid4(),
-        organization_id=org_id,
-        creator_id=creator.id,
-        campaign_id=campaign.id,
-        creator_handle=req.creator_handle,
-        campaign_slug=req.campaign_slug,
-        asset_slug=req.asset_slug,
-        destination_url=req.destination_url,
-        source="member",
-    )
-    db.add(link)
     await db.commit()
-    await db.refresh(link)
 
-    path = f"/c/{link.creator_handle}/{link.campaign_slug}"
-    if link.asset_slug:
-        path += f"/{link.asset_slug}"
+    path = f"/c/{req.creator_handle}/{req.campaign_slug}"
+    if req.asset_slug:
+        path += f"/{req.asset_slug}"
     wrapper_url = f"{settings.base_url}{path}"
 
     return {
         "id": str(link.id),
         "wrapper_url": wrapper_url,
-        "destination_url": link.destination_url,
-        "creator_handle": link.creator_handle,
-        "campaign_slug": link.campaign_slug,
-        "asset_slug": link.asset_slug,
+        "destination_url": req.destination_url,
+        "creator_handle": req.creator_handle,
+        "campaign_slug": req.campaign_slug,
+        "asset_slug": req.asset_slug,
         "status": link.status,
         "created_at": link.created_at.isoformat() if link.created_at else None,
     }
@@ -12,23 +12,28 @@ GET /demo/admin/links  (admin only — your eyes only)
   - Protected by X-API-Key (your secret key)
 """
 
+import asyncio
 import hashlib
-import re
 import time
-from collections import defaultdict
+from collections import deque
 from datetime import datetime, timedelta, timezone
+from urllib.parse import urlsplit
 from uuid import UUID, uuid4
 
 from fastapi import APIRouter, Depends, HTTPException, Request
 from pydantic import BaseModel
-from sqlalchemy import select, func, update
+from sqlalchemy import literal, select, func, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config import get_settings
+from app.core import link_cache
+from app.core.rate_limit_lua import sliding_window_hit
 from app.models.database import get_db
 from app.models.tables import Campaign, Creator, Link, Organization
-from app.models.demo import DemoLink, _generate_slug
+from app.models.demo import DemoLink, _generate_slugs
 from app.middleware.auth import AuthContext, require_secret_key
+from app.middleware.rate_limit import forwarded_client_ip
 
 import structlog
 
@@ -40,7 +45,7 @@ router = APIRouter(prefix="/demo", tags=["demo"])
 # CORS preflight — explicit OPTIONS handler
 # ---------------------------------------------------------------------------
 
-from fastapi.responses import Response
+from fastapi.responses import ORJSONResponse, Response
 
 @router.options("/wrap")
 async def wrap_options():
@@ -56,10 +61,12 @@ async def wrap_options():
 
 
 # ---------------------------------------------------------------------------
-# In-memory rate limiter for demo endpoint (simple, resets on restart)
+# Rate limiter for demo endpoint — Redis sliding window, shared across
+# workers. Falls back to in-memory (per-process, resets on restart) if
+# Redis is unreachable.
 # ---------------------------------------------------------------------------
 
-_demo_rate_limits: dict[str, list[float]] = defaultdict(list)
+_demo_rate_limits: dict[str, deque[float]] = {}
 DEMO_RATE_LIMIT = 10        # max links per IP
 DEMO_RATE_WINDOW = 3600     # per hour
 
@@ -68,53 +75,97 @@ DEMO_ORG_SLUG = "wrpper-demo"
 DEMO_CREATOR_HANDLE = "demo"
 DEMO_CAMPAIGN_SLUG = "website-demo"
 
+# Settings are fixed for the process lifetime
+_BASE_URL: str = get_settings().base_url
 
-def _check_demo_rate_limit(ip: str):
-    """Simple in-memory rate limiter. 10 demo links per IP per hour."""
+
+async def _check_demo_rate_limit(ip: str) -> int | None:
+    """10 demo links per IP per hour. Returns this IP's hit count in the window, including this one.
+
+    None when Redis is down: the in-memory fallback only sees this worker's
+    hits, so its count says nothing about wraps made through other workers.
+    """
+    count = await sliding_window_hit(f"demo_rl:{ip}", DEMO_RATE_LIMIT, DEMO_RATE_WINDOW)
+    if count is None:
+        _check_demo_rate_limit_memory(ip)
+        return None
+    if count > DEMO_RATE_LIMIT:
+        raise HTTPException(
+            status_code=429,
+            detail=f"Rate limit exceeded. Max {DEMO_RATE_LIMIT} demo links per hour.",
+        )
+    return count
+
+
+def _check_demo_rate_limit_memory(ip: str):
+    """In-memory fallback for when Redis is down."""
     now = time.time()
     window_start = now - DEMO_RATE_WINDOW
 
-    # Clean old entries
-    _demo_rate_limits[ip] = [t for t in _demo_rate_limits[ip] if t > window_start]
+    dq = _demo_rate_limits.get(ip)
+    if dq is None:
+        dq = _demo_rate_limits[ip] = deque(maxlen=DEMO_RATE_LIMIT)
+
+    # Evict expired entries in place (oldest first)
+    while dq and dq[0] <= window_start:
+        dq.popleft()
 
-    if len(_demo_rate_limits[ip]) >= DEMO_RATE_LIMIT:
+    if len(dq) >= DEMO_RATE_LIMIT:
         raise HTTPException(
             status_code=429,
             detail=f"Rate limit exceeded. Max {DEMO_RATE_LIMIT} demo links per hour.",
         )
 
-    _demo_rate_limits[ip].append(now)
+    dq.append(now)
+
+
+async def demo_ratelimit_janitor(interval: int = 60):
+    """Periodically drop IPs with no hits inside the window. Runs for the app's lifetime.
+    All mutations happen on the event loop, so no lock is needed."""
+    while True:
+        await asyncio.sleep(interval)
+        cutoff = time.time() - DEMO_RATE_WINDOW
+        for ip, dq in list(_demo_rate_limits.items()):
+            if not dq or dq[-1] < cutoff:
+                del _demo_rate_limits[ip]
 
 
 def _get_real_ip(request: Request) -> str:
+    """Rightmost public hop in X-Forwarded-For — entries left of it are
+    client-supplied and spoofable. Same hop parsing as get_client_ip: junk
+    hops are skipped, and with no usable hop the socket peer is used."""
     forwarded = request.headers.get("x-forwarded-for")
-    if forwarded:
-        ips = [ip.strip() for ip in forwarded.split(",")]
-        for ip in ips:
-            if not ip.startswith(("10.", "172.16.", "192.168.", "127.", "::1")):
-                return ip
-        return ips[0]
+    found = forwarded_client_ip(forwarded, rightmost=True) if forwarded else None
+    if found is not None:
+        return found[0]
     return request.client.host if request.client else "unknown"
 
 
+# Internal/private hosts — a tuple so str.startswith checks them all in one call
+_BLOCKED_HOST_PREFIXES: tuple[str, ...] = (
+    "localhost", "127.", "0.0.0.0", "169.254.", "10.", "192.168.", "172.16.", "::1",
+)
+
+
 def _validate_url(url: str) -> str:
     """Validate and normalize the URL."""
     url = url.strip()
 
     # Auto-add https:// if missing
-    if not url.startswith(("https://", "http://")):
+    if not url[:8].lower().startswith(("https://", "http://")):
         url = "https://" + url
 
-    # Block internal/private IPs
+    # Block internal/private IPs — hostname handles ports, userinfo and
+    # bracketed IPv6 literals ("[::1]" → "::1")
     try:
-        host = url.split("//")[1].split("/")[0].split(":")[0]
-    except (IndexError, ValueError):
+        host = urlsplit(url).hostname
+    except ValueError:
+        host = None
+    if not host:
         raise HTTPException(status_code=400, detail="Invalid URL format")
 
-    blocked = ["localhost", "127.0.0.1", "0.0.0.0", "169.254.", "10.", "192.168.", "172.16."]
-    for b in blocked:
-        if host.startswith(b) or host == b.rstrip("."):
-            raise HTTPException(status_code=400, detail="Cannot wrap internal URLs")
+    if host.startswith(_BLOCKED_HOST_PREFIXES):
+        raise HTTPException(status_code=400, detail="Cannot wrap internal URLs")
 
     if len(url) > 2048:
         raise HTTPException(status_code=400, detail="URL too long (max 2048 chars)")
@@ -158,63 +209,54 @@ class DemoAdminResponse(BaseModel):
 # Helpers — ensure demo org/creator/campaign exist
 # ---------------------------------------------------------------------------
 
-async def _ensure_demo_org(db: AsyncSession) -> Organization:
-    """Get or create the demo organization."""
-    stmt = select(Organization).where(Organization.slug == DEMO_ORG_SLUG)
-    result = await db.execute(stmt)
-    org = result.scalar_one_or_none()
-
-    if not org:
-        org = Organization(
-            name="Wrpper Demo",
-            slug=DEMO_ORG_SLUG,
-        )
-        db.add(org)
-        await db.flush()
-        logger.info("demo_org_created", slug=DEMO_ORG_SLUG)
+# (org_id, creator_id, campaign_id) — fixed once created, so fetched once per process
+_demo_ids_cache: tuple[UUID, UUID, UUID] | None = None
+_demo_ids_lock = asyncio.Lock()
 
-    return org
-
-
-async def _ensure_demo_creator(db: AsyncSession) -> Creator:
-    """Get or create the demo creator."""
-    stmt = select(Creator).where(Creator.handle == DEMO_CREATOR_HANDLE)
-    result = await db.execute(stmt)
-    creator = result.scalar_one_or_none()
 
-    if not creator:
-        creator = Creator(
-            handle=DEMO_CREATOR_HANDLE,
-            display_name="Demo User",
-            platform="website",
-        )
-        db.add(creator)
-        await db.flush()
-        logger.info("demo_creator_created", handle=DEMO_CREATOR_HANDLE)
-
-    return creator
-
-
-async def _ensure_demo_campaign(db: AsyncSession, org_id: UUID) -> Campaign:
-    """Get or create the demo campaign."""
-    stmt = select(Campaign).where(
-        Campaign.organization_id == org_id,
-        Campaign.slug == DEMO_CAMPAIGN_SLUG,
-    )
-    result = await db.execute(stmt)
-    campaign = result.scalar_one_or_none()
+async def _ensure_demo_ids(db: AsyncSession) -> tuple[UUID, UUID, UUID]:
+    """Get or create the demo org/creator/campaign ids.
 
-    if not campaign:
-        campaign = Campaign(
-            organization_id=org_id,
-            name="Website Demo",
-            slug=DEMO_CAMPAIGN_SLUG,
-        )
-        db.add(campaign)
-        await db.flush()
-        logger.info("demo_campaign_created", slug=DEMO_CAMPAIGN_SLUG)
+    One INSERT ... ON CONFLICT DO UPDATE ... RETURNING per table (the no-op
+    update makes RETURNING yield existing rows too), committed before
+    caching. Every request after the first is served from memory.
+    """
+    global _demo_ids_cache
+    if _demo_ids_cache is not None:
+        return _demo_ids_cache
+
+    async with _demo_ids_lock:
+        if _demo_ids_cache is not None:
+            return _demo_ids_cache
+
+        org_id = (await db.execute(
+            pg_insert(Organization)
+            .values(id=uuid4(), name="Wrpper Demo", slug=DEMO_ORG_SLUG)
+            .on_conflict_do_update(index_elements=["slug"], set_={"slug": Organization.slug})
+            .returning(Organization.id)
+        )).scalar_one()
+
+        creator_id = (await db.execute(
+            pg_insert(Creator)
+            .values(id=uuid4(), handle=DEMO_CREATOR_HANDLE, display_name="Demo User", platform="website")
+            .on_conflict_do_update(index_elements=["handle"], set_={"handle": Creator.handle})
+            .returning(Creator.id)
+        )).scalar_one()
+
+        campaign_id = (await db.execute(
+            pg_insert(Campaign)
+            .values(id=uuid4(), organization_id=org_id, name="Website Demo", slug=DEMO_CAMPAIGN_SLUG)
+            .on_conflict_do_update(
+                index_elements=["organization_id", "slug"],
+                set_={"slug": Campaign.slug},
+            )
+            .returning(Campaign.id)
+        )).scalar_one()
 
-    return campaign
+        await db.commit()
+        _demo_ids_cache = (org_id, creator_id, campaign_id)
+        logger.info("demo_ids_loaded", org_id=str(org_id))
+        return _demo_ids_cache
 
 
 # ---------------------------------------------------------------------------
@@ -231,84 +273,100 @@ async def wrap_demo_link(
     Public endpoint for the marketing site wrap bar.
     No auth required — rate-limited by IP.
     """
-    settings = get_settings()
     ip = _get_real_ip(request)
     ua = request.headers.get("user-agent", "")
 
     # Rate limit
-    _check_demo_rate_limit(ip)
+    recent_hits = await _check_demo_rate_limit(ip)
 
     # Validate URL
     original_url = _validate_url(req.url)
 
     # Ensure demo infrastructure exists
-    org = await _ensure_demo_org(db)
-    creator = await _ensure_demo_creator(db)
-    campaign = await _ensure_demo_campaign(db, org.id)
-
-    # Generate unique slug
-    for _ in range(10):  # retry on collision
-        slug = _generate_slug(7)
-        existing = await db.execute(
-            select(DemoLink).where(DemoLink.slug == slug)
-        )
-        if not existing.scalar_one_or_none():
+    org_id, creator_id, campaign_id = await _ensure_demo_ids(db)
+
+    # Generate unique slug — probe a batch of candidates in one query
+    slug = None
+    for _ in range(3):  # retry on (vanishingly rare) full-batch collision
+        candidates = _generate_slugs(4, 7)
+        taken = set((await db.execute(
+            select(DemoLink.slug).where(DemoLink.slug.in_(candidates))
+        )).scalars())
+        slug = next((c for c in candidates if c not in taken), None)
+        if slug:
             break
     else:
         raise HTTPException(status_code=500, detail="Could not generate unique slug")
 
     # Check if this exact URL was already wrapped by this IP recently (dedup)
-    fingerprint = hashlib.sha256(f"{ip}:{ua}".encode()).hexdigest()
-    recent_cutoff = datetime.now(timezone.utc) - timedelta(minutes=5)
-
-    stmt = select(DemoLink).where(
-        DemoLink.creator_fingerprint == fingerprint,
-        DemoLink.original_url == original_url,
-        DemoLink.created_at > recent_cutoff,
-    )
-    result = await db.execute(stmt)
-    existing_demo = result.scalar_one_or_none()
-
-    if existing_demo:
-        # Return the existing one instead of creating a duplicate
-        return DemoWrapResponse(
-            wrapped_url=existing_demo.wrapped_url,
-            original_url=existing_demo.original_url,
-            slug=existing_demo.slug,
-            expires_in_hours=72,
+    fingerprint = hashlib.blake2b(f"{ip}:{ua}".encode(), digest_size=32).hexdigest()
+
+    # A first hit in the (cluster-wide, Redis) rate-limit window can't have a
+    # recent wrap to match — skip the dedup lookup for cold IPs.
+    if recent_hits is None or recent_hits > 1:
+        recent_cutoff = datetime.now(timezone.utc) - timedelta(minutes=5)
+        stmt = select(DemoLink).where(
+            DemoLink.creator_fingerprint == fingerprint,
+            DemoLink.original_url == original_url,
+            DemoLink.created_at > recent_cutoff,
         )
-
-    # Create the real Link row (so /c/ redirect works)
-    link = Link(
-        organization_id=org.id,
-        creator_id=creator.id,
-        campaign_id=campaign.id,
-        creator_handle=DEMO_CREATOR_HANDLE,
-        campaign_slug=DEMO_CAMPAIGN_SLUG,
-        asset_slug=slug,
-        destination_url=original_url,
-        source="demo",
-        metadata_={"source": "demo_website", "creator_ip_hash": fingerprint[:16]},
-    )
-    db.add(link)
-    await db.flush()
+        result = await db.execute(stmt)
+        existing_demo = result.scalar_one_or_none()
+
+        if existing_demo:
+            # Return the existing one instead of creating a duplicate
+            # (values read back from our own row — no re-validation)
+            return DemoWrapResponse.model_construct(
+                wrapped_url=existing_demo.wrapped_url,
+                original_url=existing_demo.original_url,
+                slug=existing_demo.slug,
+                expires_in_hours=72,
+            )
 
     # Build the wrapped URL
     wrapper_path = f"/c/{DEMO_CREATOR_HANDLE}/{DEMO_CAMPAIGN_SLUG}/{slug}"
-    wrapped_url = f"{settings.base_url}{wrapper_path}"
-
-    # Create the DemoLink tracking row
-    demo_link = DemoLink(
-        slug=slug,
-        original_url=original_url,
-        wrapped_url=wrapped_url,
-        link_id=link.id,
-        creator_ip=ip,
-        creator_user_agent=ua[:500] if ua else None,
-        creator_fingerprint=fingerprint,
-        expires_at=datetime.now(timezone.utc) + timedelta(hours=72),
+    wrapped_url = f"{_BASE_URL}{wrapper_path}"
+
+    # Create the real Link row (so /c/ redirect works) and the DemoLink
+    # tracking row in one statement: INSERT links in a CTE, feed its id
+    # into INSERT demo_links.
+    new_link = (
+        pg_insert(Link)
+        .values(
+            id=uuid4(),
+            organization_id=org_id,
+            creator_id=creator_id,
+            campaign_id=campaign_id,
+            creator_handle=DEMO_CREATOR_HANDLE,
+            campaign_slug=DEMO_CAMPAIGN_SLUG,
+            asset_slug=slug,
+            destination_url=original_url,
+            source="demo",
+            status="active",
+            metadata_={"source": "demo_website", "creator_ip_hash": fingerprint[:16]},
+        )
+        .returning(Link.id)
+        .cte("new_link")
+    )
+    demo_values = {
+        "id": uuid4(),
+        "slug": slug,
+        "original_url": original_url,
+        "wrapped_url": wrapped_url,
+        "creator_ip": ip,
+        "creator_user_agent": ua[:500] if ua else None,
+        "creator_fingerprint": fingerprint,
+        "expires_at": datetime.now(timezone.utc) + timedelta(hours=72),
+    }
+    await db.execute(
+        pg_insert(DemoLink).from_select(
+            [*demo_values, "link_id"],
+            select(
+                *(literal(v, type_=DemoLink.__table__.c[k].type) for k, v in demo_values.items()),
+                new_link.c.id,
+            ),
+        )
     )
-    db.add(demo_link)
     await db.commit()
 
     logger.info("demo_link_created",
@@ -317,7 +375,8 @@ async def wrap_demo_link(
                 ip=ip,
                 wrapped_url=wrapped_url)
 
-    return DemoWrapResponse(
+    # Every field was just validated or built here — skip re-validating
+    return DemoWrapResponse.model_construct(
         wrapped_url=wrapped_url,
         original_url=original_url,
         slug=slug,
@@ -340,38 +399,46 @@ async def list_demo_links(
     """
     List all demo links with metadata. Admin only.
     """
-    stmt = select(DemoLink).order_by(DemoLink.created_at.desc())
+    # Only the columns the admin view shows, as plain rows (no ORM hydration).
+    # Total rides along on every row via count(*) OVER () — one round-trip.
+    stmt = select(
+        DemoLink.id,
+        DemoLink.slug,
+        DemoLink.original_url,
+        DemoLink.wrapped_url,
+        DemoLink.creator_ip,
+        DemoLink.click_count,
+        DemoLink.is_active,
+        DemoLink.created_at,
+        DemoLink.expires_at,
+        func.count().over().label("total_count"),
+    ).order_by(DemoLink.created_at.desc())
 
     if active_only:
         stmt = stmt.where(DemoLink.is_active == True)
 
-    # Get total count
-    count_stmt = select(func.count()).select_from(DemoLink)
-    if active_only:
-        count_stmt = count_stmt.where(DemoLink.is_active == True)
-    total = (await db.execute(count_stmt)).scalar()
-
     stmt = stmt.offset(offset).limit(limit)
-    result = await db.execute(stmt)
-    links = result.scalars().all()
-
-    return DemoAdminResponse(
-        total=total,
-        links=[
-            DemoLinkAdmin(
-                id=str(link.id),
-                slug=link.slug,
-                original_url=link.original_url,
-                wrapped_url=link.wrapped_url,
-                creator_ip=link.creator_ip,
-                click_count=link.click_count,
-                is_active=link.is_active,
-                created_at=link.created_at,
-                expires_at=link.expires_at,
-            )
-            for link in links
+    rows = (await db.execute(stmt)).all()
+
+    if rows:
+        total = rows[0].total_count
+    elif offset:
+        # Paged past the end — no row to carry the window count
+        count_stmt = select(func.count()).select_from(DemoLink)
+        if active_only:
+            count_stmt = count_stmt.where(DemoLink.is_active == True)
+        total = (await db.execute(count_stmt)).scalar()
+    else:
+        total = 0
+
+    # orjson serializes UUID/datetime natively — no per-row str()/model building
+    return ORJSONResponse(content={
+        "total": total,
+        "links": [
+            {k: v for k, v in row._mapping.items() if k != "total_count"}
+            for row in rows
         ],
-    )
+    })
 
 
 # ---------------------------------------------------------------------------
@@ -400,6 +467,7 @@ async def deactivate_demo_link(
     )
 
     await db.commit()
+    await link_cache.invalidate(DEMO_CREATOR_HANDLE, DEMO_CAMPAIGN_SLUG, slug)
     logger.info("demo_link_deactivated", slug=slug)
 
     return {"status": "deactivated", "slug": slug}
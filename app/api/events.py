@@ -7,17 +7,21 @@ Security:
   - Rate limited per API key
   - Click ID signature validated before persisting
   - No data returned in responses (write-only for publishable keys)
+
+Writes are buffered (app/core/event_buffer.py): endpoints return 202 once the
+event is validated and queued; rows are inserted in batches.
 """
 
-from typing import Literal
+from typing import Annotated, Final, Literal
+from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException
-from pydantic import BaseModel
-from sqlalchemy.ext.asyncio import AsyncSession
+import msgspec
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.exceptions import RequestValidationError
 
 from app.core.click_id import verify_click_id
-from app.models.database import get_db
-from app.models.tables import ConversionEvent, PageViewEvent, RefundEvent, SessionEvent
+from app.core.event_buffer import event_buffer
+from app.models.tables import ConversionEvent, PageViewEvent, RefundEvent, SessionEvent, UniversalEvent
 from app.middleware.auth import AuthContext, require_auth, enforce_org_scope
 from app.middleware.rate_limit import rate_limit_api_key
 
@@ -28,42 +32,60 @@ router = APIRouter(prefix="/v1/events", tags=["events"])
 
 
 # --- Request schemas ---
+# msgspec Structs, decoded straight from the raw body (see _decode_body) —
+# these routes skip FastAPI's body binding on the ingest hot path. Bounded
+# strings mirror their column widths, so an oversized value is a 422 here
+# rather than a failed INSERT in the event buffer.
+
+Str3 = Annotated[str, msgspec.Meta(max_length=3)]
+Str50 = Annotated[str, msgspec.Meta(max_length=50)]
+Str100 = Annotated[str, msgspec.Meta(max_length=100)]
+Str255 = Annotated[str, msgspec.Meta(max_length=255)]
+
 
-class SessionPayload(BaseModel):
-    inf_click_id: str
+class SessionPayload(msgspec.Struct, kw_only=True):
+    inf_click_id: Str100
     organization_id: str
-    session_id: str | None = None
+    session_id: Str100 | None = None
     page_url: str | None = None
     referrer: str | None = None
 
 
-class PageViewPayload(BaseModel):
-    inf_click_id: str
+class PageViewPayload(msgspec.Struct, kw_only=True):
+    inf_click_id: Str100
     organization_id: str
     page_url: str | None = None
     time_on_page_ms: int | None = None
 
 
-class ConversionPayload(BaseModel):
-    inf_click_id: str
+class ConversionPayload(msgspec.Struct, kw_only=True):
+    inf_click_id: Str100
     organization_id: str
     event_type: Literal["add_to_cart", "signup", "purchase", "lead", "custom"] = "purchase"
-    order_id: str | None = None
+    order_id: Str255 | None = None
     revenue_cents: int | None = None
-    currency: str = "USD"
+    currency: Str3 = "USD"
     metadata: dict | None = None
 
 
-class RefundPayload(BaseModel):
-    inf_click_id: str
+class RefundPayload(msgspec.Struct, kw_only=True):
+    inf_click_id: Str100
     organization_id: str
-    original_order_id: str
+    original_order_id: Str255
     refund_amount_cents: int | None = None
     reason: str | None = None
 
 
 # --- Shared validation ---
 
+def _decode_body(decoder: msgspec.json.Decoder, raw: bytes):
+    """Decode + validate a request body; errors surface as 422 like FastAPI's own binding."""
+    try:
+        return decoder.decode(raw)
+    except msgspec.DecodeError as e:
+        raise RequestValidationError([{"type": "value_error", "loc": ("body",), "msg": str(e)}])
+
+
 def _validate_click_id(raw: str) -> str:
     click = verify_click_id(raw)
     if click is None:
@@ -73,7 +95,6 @@ def _validate_click_id(raw: str) -> str:
 
 def _validate_org(auth: AuthContext, org_id_str: str):
     """Enforce that the API key's org matches the payload org."""
-    from uuid import UUID
     try:
         org_id = UUID(org_id_str)
     except ValueError:
@@ -81,118 +102,18 @@ def _validate_org(auth: AuthContext, org_id_str: str):
     enforce_org_scope(auth, org_id)
 
 
-# --- Endpoints ---
-
-@router.post("/session", status_code=201)
-async def ingest_session(
-    payload: SessionPayload,
-    auth: AuthContext = Depends(require_auth),
-    db: AsyncSession = Depends(get_db),
-):
-    rate_limit_api_key(str(auth.key_id))
-    _validate_org(auth, payload.organization_id)
-    _validate_click_id(payload.inf_click_id)
-
-    event = SessionEvent(
-        click_id=payload.inf_click_id,
-        organization_id=payload.organization_id,
-        session_id=payload.session_id,
-        page_url=payload.page_url,
-        referrer=payload.referrer,
-    )
-    db.add(event)
-    await db.commit()
-
-    logger.info("session_event", click_id=payload.inf_click_id, org=payload.organization_id)
-    return {"status": "ok", "event_type": "session"}
-
-
-@router.post("/pageview", status_code=201)
-async def ingest_pageview(
-    payload: PageViewPayload,
-    auth: AuthContext = Depends(require_auth),
-    db: AsyncSession = Depends(get_db),
-):
-    rate_limit_api_key(str(auth.key_id))
-    _validate_org(auth, payload.organization_id)
-    _validate_click_id(payload.inf_click_id)
-
-    event = PageViewEvent(
-        click_id=payload.inf_click_id,
-        organization_id=payload.organization_id,
-        page_url=payload.page_url,
-        time_on_page_ms=payload.time_on_page_ms,
-    )
-    db.add(event)
-    await db.commit()
-
-    logger.info("pageview_event", click_id=payload.inf_click_id)
-    return {"status": "ok", "event_type": "pageview"}
-
-
-@router.post("/conversion", status_code=201)
-async def ingest_conversion(
-    payload: ConversionPayload,
-    auth: AuthContext = Depends(require_auth),
-    db: AsyncSession = Depends(get_db),
-):
-    rate_limit_api_key(str(auth.key_id))
-    _validate_org(auth, payload.organization_id)
-    _validate_click_id(payload.inf_click_id)
-
-    event = ConversionEvent(
-        click_id=payload.inf_click_id,
-        organization_id=payload.organization_id,
-        event_type=payload.event_type,
-        order_id=payload.order_id,
-        revenue_cents=payload.revenue_cents,
-        currency=payload.currency,
-        metadata_=payload.metadata,
-    )
-    db.add(event)
-    await db.commit()
-
-    logger.info("conversion_event", click_id=payload.inf_click_id,
-                event_type=payload.event_type, revenue_cents=payload.revenue_cents)
-    return {"status": "ok", "event_type": "conversion"}
-
-
-@router.post("/refund", status_code=201)
-async def ingest_refund(
-    payload: RefundPayload,
-    auth: AuthContext = Depends(require_auth),
-    db: AsyncSession = Depends(get_db),
-):
-    rate_limit_api_key(str(auth.key_id))
-    _validate_org(auth, payload.organization_id)
-    _validate_click_id(payload.inf_click_id)
-
-    event = RefundEvent(
-        click_id=payload.inf_click_id,
-        organization_id=payload.organization_id,
-        original_order_id=payload.original_order_id,
-        refund_amount_cents=payload.refund_amount_cents,
-        reason=payload.reason,
-    )
-    db.add(event)
-    await db.commit()
-
-    logger.info("refund_event", click_id=payload.inf_click_id, order_id=payload.original_order_id)
-    return {"status": "ok", "event_type": "refund"}
-
-
 # ---------------------------------------------------------------------------
 # Universal event endpoint (v5 pixel — captures everything)
 # ---------------------------------------------------------------------------
 
-class UniversalEventPayload(BaseModel):
+class UniversalEventPayload(msgspec.Struct, kw_only=True):
     """Accept anything the pixel sends. Minimal validation, maximum capture."""
-    click_id: str | None = None
-    org_id: str | None = None
-    organization_id: str | None = None  # backward compat
-    session_id: str | None = None
-    event_type: str
-    event_source: str = "unknown"
+    click_id: Str100 | None = None
+    org_id: Str100 | None = None
+    organization_id: Str100 | None = None  # backward compat
+    session_id: Str100 | None = None
+    event_type: Str100
+    event_source: Str50 = "unknown"
     event_data: dict | None = None
     timestamp: str | None = None
     page: dict | None = None
@@ -200,48 +121,63 @@ class UniversalEventPayload(BaseModel):
     site_signals: dict | None = None
 
     # Legacy fields that might come in
-    inf_click_id: str | None = None
+    inf_click_id: Str100 | None = None
+
+
+_universal_decoder = msgspec.json.Decoder(UniversalEventPayload, strict=False)
 
+# Shared stand-in for absent nested objects — read-only, never mutated
+_EMPTY_DICT: Final[dict] = {}
 
-@router.post("/universal", status_code=201)
+
+def _clip(value, max_length: int) -> str | None:
+    """Free-form pixel string → fits its column. Non-strings are dropped."""
+    return value[:max_length] if isinstance(value, str) else None
+
+
+@router.post("/universal", status_code=202)
 async def ingest_universal(
-    payload: UniversalEventPayload,
+    request: Request,
     auth: AuthContext = Depends(require_auth),
-    db: AsyncSession = Depends(get_db),
 ):
     """
     Universal event ingestion — accepts any event from the v5 pixel.
     Minimal validation. Store everything. Classify later.
     """
-    rate_limit_api_key(str(auth.key_id))
+    payload = _decode_body(_universal_decoder, await request.body())
+    rate_limit_api_key(auth.key_id_str)
 
-    org_id = payload.org_id or payload.organization_id or str(auth.organization_id)
+    org_id = payload.org_id or payload.organization_id or auth.organization_id_str
     click_id = payload.click_id or payload.inf_click_id
 
-    page = payload.page or {}
-    visitor = payload.visitor or {}
-
-    from app.models.tables import UniversalEvent
-
-    event = UniversalEvent(
-        click_id=click_id,
-        organization_id=org_id,
-        session_id=payload.session_id,
-        event_type=payload.event_type,
-        event_source=payload.event_source,
-        event_data=payload.event_data,
-        page_url=page.get("url"),
-        page_path=page.get("path"),
-        page_title=page.get("title"),
-        page_type=page.get("type_hint") or (payload.event_data or {}).get("page_type"),
-        visit_number=visitor.get("visit_number"),
-        pages_this_session=visitor.get("pages_this_session"),
-        days_since_first_visit=visitor.get("days_since_first_visit"),
-        detected_vertical=(payload.event_data or {}).get("detected_vertical") if payload.event_type == "site_detection" else None,
-        detected_tools=(payload.event_data or {}).get("tools") if payload.event_type == "site_detection" else None,
-    )
-    db.add(event)
-    await db.commit()
+    page = payload.page or _EMPTY_DICT
+    visitor = payload.visitor or _EMPTY_DICT
+    event_data = payload.event_data or _EMPTY_DICT
+
+    # Detection fields only exist on site_detection events
+    if payload.event_type == "site_detection":
+        detected_vertical = _clip(event_data.get("detected_vertical"), 50)
+        detected_tools = event_data.get("tools")
+    else:
+        detected_vertical = detected_tools = None
+
+    await event_buffer.put(UniversalEvent, {
+        "click_id": click_id,
+        "organization_id": org_id,
+        "session_id": payload.session_id,
+        "event_type": payload.event_type,
+        "event_source": payload.event_source,
+        "event_data": payload.event_data,
+        "page_url": page.get("url"),
+        "page_path": _clip(page.get("path"), 500),
+        "page_title": _clip(page.get("title"), 500),
+        "page_type": _clip(page.get("type_hint") or event_data.get("page_type"), 50),
+        "visit_number": visitor.get("visit_number"),
+        "pages_this_session": visitor.get("pages_this_session"),
+        "days_since_first_visit": visitor.get("days_since_first_visit"),
+        "detected_vertical": detected_vertical,
+        "detected_tools": detected_tools,
+    })
 
     logger.info("universal_event",
                 event_type=payload.event_type,
@@ -251,3 +187,61 @@ async def ingest_universal(
                 session=payload.session_id)
 
     return {"status": "ok", "event_type": payload.event_type}
+
+
+# ---------------------------------------------------------------------------
+# Typed event endpoints — POST /v1/events/{session,pageview,conversion,refund}
+# One handler per type, built from a table. Each is registered on its own
+# literal path: a /{event_type} catch-all would shadow the other routes
+# under /v1/events (identify and custom live in pixel.py).
+# ---------------------------------------------------------------------------
+
+# event_type → (table model, body decoder). strict=False keeps the lax
+# "123" → 123 coercion clients relied on under Pydantic.
+_EVENT_MODELS: dict[str, tuple[type, msgspec.json.Decoder]] = {
+    "session": (SessionEvent, msgspec.json.Decoder(SessionPayload, strict=False)),
+    "pageview": (PageViewEvent, msgspec.json.Decoder(PageViewPayload, strict=False)),
+    "conversion": (ConversionEvent, msgspec.json.Decoder(ConversionPayload, strict=False)),
+    "refund": (RefundEvent, msgspec.json.Decoder(RefundPayload, strict=False)),
+}
+
+
+# event_type → extra log fields, as (log key, payload attribute)
+_LOG_FIELDS: dict[str, tuple[tuple[str, str], ...]] = {
+    "session": (("org", "organization_id"),),
+    "pageview": (),
+    "conversion": (("event_type", "event_type"), ("revenue_cents", "revenue_cents")),
+    "refund": (("order_id", "original_order_id"),),
+}
+
+
+def _typed_event_endpoint(event_type: str):
+    model, decoder = _EVENT_MODELS[event_type]
+    log_fields = _LOG_FIELDS[event_type]
+
+    async def ingest_event(
+        request: Request,
+        auth: AuthContext = Depends(require_auth),
+    ):
+        payload = _decode_body(decoder, await request.body())
+        rate_limit_api_key(auth.key_id_str)
+        _validate_org(auth, payload.organization_id)
+        _validate_click_id(payload.inf_click_id)
+
+        # Payload fields map 1:1 onto table columns, except the click id
+        row = msgspec.structs.asdict(payload)
+        row["click_id"] = row.pop("inf_click_id")
+        await event_buffer.put(model, row)
+
+        logger.info(f"{event_type}_event", click_id=payload.inf_click_id,
+                    **{key: getattr(payload, attr) for key, attr in log_fields})
+        return {"status": "ok", "event_type": event_type}
+
+    return ingest_event
+
+
+for _event_type in _EVENT_MODELS:
+    router.add_api_route(
+        f"/{_event_type}", _typed_event_endpoint(_event_type),
+        methods=["POST"], status_code=202, name=f"ingest_{_event_type}",
+    )
@@ -8,15 +8,21 @@ Security:
   - No organization_id in request body — derived from the API key
 """
 
-from uuid import UUID
+import base64
+from datetime import datetime
+from uuid import UUID, uuid4
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
-from sqlalchemy import select
+from sqlalchemy import func, literal, select, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config import get_settings
-from app.models.database import get_db
+from app.core import link_cache
+from app.core.url_validate import validate_destination_url
+from app.models.database import commit_without_fsync, get_db
 from app.models.tables import Link
 from app.middleware.auth import AuthContext, require_secret_key
 from app.middleware.rate_limit import rate_limit_api_key
@@ -26,6 +32,9 @@ import structlog
 logger = structlog.get_logger()
 router = APIRouter(prefix="/v1/links", tags=["links"])
 
+# Settings are fixed for the process lifetime — resolve the URL prefix once
+_WRAPPER_PREFIX: str = get_settings().base_url + "/c/"
+
 
 class CreateLinkRequest(BaseModel):
     creator_id: UUID
@@ -48,97 +57,115 @@ class LinkResponse(BaseModel):
     model_config = {"from_attributes": True}
 
 
-def _validate_destination_url(url: str):
-    """Prevent open redirect attacks — only allow http/https destinations."""
-    if not url.startswith(("https://", "http://")):
-        raise HTTPException(status_code=400, detail="destination_url must start with https:// or http://")
-    # Block internal/private URLs
-    blocked = ["localhost", "127.0.0.1", "0.0.0.0", "169.254.", "10.", "192.168.", "172.16."]
-    for b in blocked:
-        if b in url.split("//")[1].split("/")[0]:
-            raise HTTPException(status_code=400, detail="destination_url cannot point to internal addresses")
+class LinkPage(BaseModel):
+    items: list[LinkResponse]
+    next_cursor: str | None
+
+
+def _encode_cursor(created_at: datetime, link_id: UUID) -> str:
+    return base64.urlsafe_b64encode(f"{created_at.isoformat()}|{link_id}".encode()).decode()
+
 
+def _decode_cursor(cursor: str) -> tuple[datetime, UUID]:
+    try:
+        created_at, link_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), UUID(link_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
 
-@router.post("", response_model=LinkResponse, status_code=201)
+
+@router.post("", response_class=ORJSONResponse, responses={201: {"model": LinkResponse}}, status_code=201)
 async def create_link(
     req: CreateLinkRequest,
     auth: AuthContext = Depends(require_secret_key),
     db: AsyncSession = Depends(get_db),
 ):
-    rate_limit_api_key(str(auth.key_id))
-    settings = get_settings()
+    rate_limit_api_key(auth.key_id_str)
 
     # Validate destination URL
-    _validate_destination_url(req.destination_url)
-
-    # Check for duplicate route
-    stmt = select(Link).where(
-        Link.creator_handle == req.creator_handle,
-        Link.campaign_slug == req.campaign_slug,
-        Link.asset_slug == req.asset_slug,
-    )
-    result = await db.execute(stmt)
-    if result.scalar_one_or_none():
+    validate_destination_url(req.destination_url)
+
+    # Organization comes from the API key, not the request body.
+    # Duplicate route → unique index conflict → no row returned.
+    link = (await db.execute(
+        pg_insert(Link)
+        .values(
+            id=uuid4(),
+            organization_id=auth.organization_id,
+            creator_id=req.creator_id,
+            campaign_id=req.campaign_id,
+            creator_handle=req.creator_handle,
+            campaign_slug=req.campaign_slug,
+            asset_slug=req.asset_slug,
+            destination_url=str(req.destination_url),
+        )
+        .on_conflict_do_nothing()
+        .returning(Link.id, Link.status)
+    )).one_or_none()
+    if link is None:
+        await db.rollback()
         raise HTTPException(status_code=409, detail="Link with this route already exists")
+    await commit_without_fsync(db)
 
-    # Organization comes from the API key, not the request body
-    link = Link(
-        organization_id=auth.organization_id,
-        creator_id=req.creator_id,
-        campaign_id=req.campaign_id,
-        creator_handle=req.creator_handle,
-        campaign_slug=req.campaign_slug,
-        asset_slug=req.asset_slug,
-        destination_url=str(req.destination_url),
-    )
-    db.add(link)
-    await db.commit()
-    await db.refresh(link)
-
-    path = f"/c/{link.creator_handle}/{link.campaign_slug}"
-    if link.asset_slug:
-        path += f"/{link.asset_slug}"
-    wrapper_url = f"{settings.base_url}{path}"
+    parts = (_WRAPPER_PREFIX, req.creator_handle, "/", req.campaign_slug)
+    if req.asset_slug:
+        parts += ("/", req.asset_slug)
+    wrapper_url = "".join(parts)
 
     logger.info("link_created", link_id=str(link.id), wrapper_url=wrapper_url)
 
-    return LinkResponse(
-        id=link.id, wrapper_url=wrapper_url, destination_url=link.destination_url,
-        creator_handle=link.creator_handle, campaign_slug=link.campaign_slug,
-        asset_slug=link.asset_slug, status=link.status,
-    )
+    # Returned as a Response so FastAPI skips jsonable_encoder; orjson does it in one pass
+    return ORJSONResponse(status_code=201, content={
+        "id": link.id, "wrapper_url": wrapper_url, "destination_url": str(req.destination_url),
+        "creator_handle": req.creator_handle, "campaign_slug": req.campaign_slug,
+        "asset_slug": req.asset_slug, "status": link.status,
+    })
 
 
-@router.get("", response_model=list[LinkResponse])
+@router.get("", response_class=ORJSONResponse, responses={200: {"model": LinkPage}})
 async def list_links(
+    limit: int = Query(100, ge=1, le=500),
+    cursor: str | None = None,
     auth: AuthContext = Depends(require_secret_key),
     db: AsyncSession = Depends(get_db),
 ):
-    """List links — automatically scoped to the API key's organization."""
-    rate_limit_api_key(str(auth.key_id))
-    settings = get_settings()
-
-    # Only returns links for the authenticated org — no cross-org leakage
+    """List links, newest first — automatically scoped to the API key's organization.
+
+    Keyset-paginated: pass the previous page's `next_cursor` to continue.
+    """
+    rate_limit_api_key(auth.key_id_str)
+
+    # Only returns links for the authenticated org — no cross-org leakage.
+    # wrapper_url is assembled in SQL; rows come back as plain mappings.
+    wrapper_url = (
+        literal(_WRAPPER_PREFIX)
+        + Link.creator_handle + "/" + Link.campaign_slug
+        + func.coalesce("/" + func.nullif(Link.asset_slug, ""), "")
+    )
     stmt = (
-        select(Link)
+        select(
+            Link.id, wrapper_url.label("wrapper_url"), Link.destination_url,
+            Link.creator_handle, Link.campaign_slug, Link.asset_slug, Link.status,
+            Link.created_at,
+        )
         .where(Link.organization_id == auth.organization_id)
-        .order_by(Link.created_at.desc())
+        .order_by(Link.created_at.desc(), Link.id.desc())
+        .limit(limit + 1)
     )
-    result = await db.execute(stmt)
-    links = result.scalars().all()
-
-    responses = []
-    for link in links:
-        path = f"/c/{link.creator_handle}/{link.campaign_slug}"
-        if link.asset_slug:
-            path += f"/{link.asset_slug}"
-        responses.append(LinkResponse(
-            id=link.id, wrapper_url=f"{settings.base_url}{path}",
-            destination_url=link.destination_url,
-            creator_handle=link.creator_handle, campaign_slug=link.campaign_slug,
-            asset_slug=link.asset_slug, status=link.status,
-        ))
-    return responses
+    if cursor:
+        stmt = stmt.where(tuple_(Link.created_at, Link.id) < tuple_(*_decode_cursor(cursor)))
+
+    # The whole page is fetched before responding, so a database error is a
+    # 500 rather than a 200 with a truncated body. One extra row tells us
+    # whether another page exists.
+    rows = [dict(row) for row in (await db.execute(stmt)).mappings()]
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = _encode_cursor(rows[-1]["created_at"], rows[-1]["id"])
+    for row in rows:
+        del row["created_at"]
+    return ORJSONResponse({"items": rows, "next_cursor": next_cursor})
 
 
 @router.patch("/{link_id}/pause")
@@ -147,7 +174,7 @@ async def pause_link(
     auth: AuthContext = Depends(require_secret_key),
     db: AsyncSession = Depends(get_db),
 ):
-    rate_limit_api_key(str(auth.key_id))
+    rate_limit_api_key(auth.key_id_str)
     stmt = select(Link).where(Link.id == link_id, Link.organization_id == auth.organization_id)
     result = await db.execute(stmt)
     link = result.scalar_one_or_none()
@@ -155,6 +182,7 @@ async def pause_link(
         raise HTTPException(status_code=404, detail="Link not found")
     link.status = "paused"
     await db.commit()
+    await link_cache.invalidate(link.creator_handle, link.campaign_slug, link.asset_slug)
     return {"status": "paused"}
 
 
@@ -164,7 +192,7 @@ async def activate_link(
     auth: AuthContext = Depends(require_secret_key),
     db: AsyncSession = Depends(get_db),
 ):
-    rate_limit_api_key(str(auth.key_id))
+    rate_limit_api_key(auth.key_id_str)
     stmt = select(Link).where(Link.id == link_id, Link.organization_id == auth.organization_id)
     result = await db.execute(stmt)
     link = result.scalar_one_or_none()
@@ -172,4 +200,5 @@ async def activate_link(
         raise HTTPException(status_code=404, detail="Link not found")
     link.status = "active"
     await db.commit()
+    await link_cache.invalidate(link.creator_handle, link.campaign_slug, link.asset_slug)
     return {"status": "active"}
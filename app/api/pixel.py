@@ -6,7 +6,9 @@ POST /v1/events/identify   → Links an external customer ID to a click ID
 POST /v1/events/custom     → Generic custom event passthrough
 """
 
+import asyncio
 from datetime import datetime, timezone
+from uuid import UUID
 
 from fastapi import APIRouter, Depends, Request
 from fastapi.responses import HTMLResponse, Response
@@ -15,7 +17,7 @@ from sqlalchemy import select, or_
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.database import get_db
-from app.models.tables import ClickEvent
+from app.models.tables import ClickEvent, UniversalEvent
 from app.models.platform_connection import PlatformConnection
 from app.middleware.auth import AuthContext, require_auth, enforce_org_scope
 from app.middleware.rate_limit import rate_limit_api_key
@@ -35,39 +37,81 @@ PIXEL_GIF = (
 )
 
 
-@router.get("/pixel/heartbeat")
+class _SharedResponse(Response):
+    """Response built once and returned for every request.
+    Sends a copy of the header list so middleware that edits headers in
+    place (e.g. CORS) can't mutate the shared instance."""
+
+    async def __call__(self, scope, receive, send):
+        await send({"type": "http.response.start", "status": self.status_code, "headers": list(self.raw_headers)})
+        await send({"type": "http.response.body", "body": self.body})
+
+
+_PIXEL_RESPONSE = _SharedResponse(
+    content=PIXEL_GIF,
+    media_type="image/gif",
+    headers={
+        "Cache-Control": "no-store, no-cache, must-revalidate, max-age=0",
+        "Access-Control-Allow-Origin": "*",
+    },
+)
+
+
+# Heartbeat logging is batched off the request path: the endpoint enqueues,
+# pixel_heartbeat_log_drainer (started from the app lifespan) writes one
+# log line per batch. Overflow is dropped and counted, never blocks.
+_heartbeat_log_queue: asyncio.Queue = asyncio.Queue(maxsize=10_000)
+_heartbeat_log_dropped = 0
+
+
+async def pixel_heartbeat_log_drainer(interval: float = 1.0, max_batch: int = 500):
+    global _heartbeat_log_dropped
+    while True:
+        batch = [await _heartbeat_log_queue.get()]
+        await asyncio.sleep(interval)
+        # Empty the queue every cycle (one log line per max_batch events) so
+        # throughput isn't capped at max_batch per interval
+        while True:
+            while len(batch) < max_batch and not _heartbeat_log_queue.empty():
+                batch.append(_heartbeat_log_queue.get_nowait())
+            dropped, _heartbeat_log_dropped = _heartbeat_log_dropped, 0
+            logger.info("pixel_heartbeat_batch", count=len(batch), dropped=dropped, events=batch)
+            if _heartbeat_log_queue.empty():
+                break
+            batch = []
+
+
 async def pixel_heartbeat(request: Request):
     """
     Fires on every page load where wrp.js is installed.
     No auth required — this is just a health check / install tracker.
     Logged for analytics: which domains have the pixel, how often it fires.
+
+    Registered as a plain Starlette route (below): no dependencies, no body
+    parsing, no response model — FastAPI's request machinery is skipped.
     """
     org = request.query_params.get("org", "")
     url = request.query_params.get("url", "")
     has_click = request.query_params.get("has_click", "0")
 
-    logger.info(
-        "pixel_heartbeat",
-        org=org,
-        domain=url,
-        has_click=has_click == "1",
-    )
+    try:
+        _heartbeat_log_queue.put_nowait({"org": org, "domain": url, "has_click": has_click == "1"})
+    except asyncio.QueueFull:
+        global _heartbeat_log_dropped
+        _heartbeat_log_dropped += 1
+
+    return _PIXEL_RESPONSE
 
-    return Response(
-        content=PIXEL_GIF,
-        media_type="image/gif",
-        headers={
-            "Cache-Control": "no-store, no-cache, must-revalidate, max-age=0",
-            "Access-Control-Allow-Origin": "*",
-        },
-    )
+
+# Starlette's add_route doesn't apply the APIRouter prefix
+router.add_route(f"{router.prefix}/pixel/heartbeat", pixel_heartbeat, methods=["GET"], include_in_schema=False)
 
 
 # --- Identify endpoint (link external customer ID to click) ---
 
 class IdentifyPayload(BaseModel):
     inf_click_id: str
-    organization_id: str
+    organization_id: UUID
     external_customer_id: str | None = None
     email_hash: str | None = None
     uid2_token: str | None = None
@@ -82,16 +126,9 @@ async def identify_user(
     auth: AuthContext = Depends(require_auth),
     db: AsyncSession = Depends(get_db),
 ):
-    rate_limit_api_key(str(auth.key_id))
-
-    from uuid import UUID
-    from app.models.tables import UniversalEvent
-    try:
-        org_id = UUID(payload.organization_id)
-    except ValueError:
-        return {"status": "error", "detail": "Invalid org ID"}
+    rate_limit_api_key(auth.key_id_str)
 
-    enforce_org_scope(auth, org_id)
+    enforce_org_scope(auth, payload.organization_id)
 
     click = verify_click_id(payload.inf_click_id)
     if click is None:
@@ -120,7 +157,7 @@ async def identify_user(
     logger.info(
         "identify_event",
         click_id=payload.inf_click_id,
-        org=payload.organization_id,
+        org=auth.organization_id_str,
         has_customer_id=bool(payload.external_customer_id),
         has_email_hash=bool(payload.email_hash),
         has_uid2=bool(payload.uid2_token),
@@ -135,7 +172,7 @@ async def identify_user(
 
 class CustomEventPayload(BaseModel):
     inf_click_id: str
-    organization_id: str
+    organization_id: UUID
     event_name: str
     metadata: dict | None = None
     page_url: str | None = None
@@ -147,15 +184,9 @@ async def custom_event(
     auth: AuthContext = Depends(require_auth),
     db: AsyncSession = Depends(get_db),
 ):
-    rate_limit_api_key(str(auth.key_id))
-
-    from uuid import UUID
-    try:
-        org_id = UUID(payload.organization_id)
-    except ValueError:
-        return {"status": "error", "detail": "Invalid org ID"}
+    rate_limit_api_key(auth.key_id_str)
 
-    enforce_org_scope(auth, org_id)
+    enforce_org_scope(auth, payload.organization_id)
 
     click = verify_click_id(payload.inf_click_id)
     if click is None:
@@ -164,7 +195,7 @@ async def custom_event(
     logger.info(
         "custom_event",
         click_id=payload.inf_click_id,
-        org=payload.organization_id,
+        org=auth.organization_id_str,
         event_name=payload.event_name,
     )
 
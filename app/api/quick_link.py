@@ -11,15 +11,21 @@ Supports:
 """
 
 import re
-from uuid import UUID
+from functools import lru_cache
+from uuid import UUID, uuid4
 
+from cachetools import TTLCache
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
 from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config import get_settings
-from app.models.database import get_db
+from app.core.url_validate import validate_destination_url
+from app.models.database import commit_without_fsync, get_db
 from app.models.tables import Campaign, Creator, Link
 from app.middleware.auth import AuthContext, require_secret_key
 from app.middleware.rate_limit import rate_limit_api_key
@@ -29,6 +35,9 @@ import structlog
 logger = structlog.get_logger()
 router = APIRouter(prefix="/v1/links", tags=["links"])
 
+# Settings are fixed for the process lifetime — resolve the URL prefix once
+_WRAPPER_PREFIX: str = get_settings().base_url + "/c/"
+
 
 # --- Schemas ---
 
@@ -64,36 +73,78 @@ class QuickLinkResponse(BaseModel):
 
 # --- Helpers ---
 
-def _slugify(text: str) -> str:
-    text = text.lower().strip()
-    text = re.sub(r"[^a-z0-9\-_]", "-", text)
-    text = re.sub(r"-+", "-", text)
-    text = text.strip("-")
-    return text
+_SLUG_INVALID = re.compile(r"[^a-z0-9\-_]")
+_SLUG_DASHES = re.compile(r"-+")
 
 
-def _validate_destination_url(url: str):
-    if not url.startswith(("https://", "http://")):
-        raise HTTPException(status_code=400, detail="destination_url must start with https:// or http://")
-    blocked = ["localhost", "127.0.0.1", "0.0.0.0", "169.254.", "10.", "192.168.", "172.16."]
-    host = url.split("//")[1].split("/")[0].split(":")[0]
-    for b in blocked:
-        if host.startswith(b) or host == b.rstrip("."):
-            raise HTTPException(status_code=400, detail="destination_url cannot point to internal addresses")
+@lru_cache(maxsize=1024)
+def _slugify(text: str) -> str:
+    # Creator/campaign names repeat heavily under burst traffic — memoized
+    text = _SLUG_INVALID.sub("-", text.lower().strip())
+    return _SLUG_DASHES.sub("-", text).strip("-")
+
+
+# Hot creator/campaign pairs skip the upsert round-trip entirely. Filled by
+# create_quick_link after commit.
+# No per-key lock: a concurrent miss just runs the idempotent upsert twice.
+_CREATOR_CACHE: TTLCache = TTLCache(maxsize=10_000, ttl=300)    # handle → creator_id
+_CAMPAIGN_CACHE: TTLCache = TTLCache(maxsize=10_000, ttl=300)   # (org_id, slug) → campaign_id
+
+
+async def _resolve_creator_campaign(
+    db: AsyncSession,
+    org_id: UUID,
+    creator_handle: str,
+    creator_name: str,
+    campaign_slug: str,
+    campaign_name: str,
+) -> tuple[UUID, UUID]:
+    creator_id = _CREATOR_CACHE.get(creator_handle)
+    campaign_id = _CAMPAIGN_CACHE.get((org_id, campaign_slug))
+    if creator_id and campaign_id:
+        return creator_id, campaign_id
+
+    # Both upserts run as CTEs of a single statement. The no-op DO UPDATE
+    # makes RETURNING yield the id of an existing row too.
+    creator_cte = (
+        pg_insert(Creator)
+        .values(id=uuid4(), handle=creator_handle, display_name=creator_name)
+        .on_conflict_do_update(index_elements=["handle"], set_={"handle": Creator.handle})
+        .returning(Creator.id)
+        .cte("upsert_creator")
+    )
+    campaign_cte = (
+        pg_insert(Campaign)
+        .values(
+            id=uuid4(),
+            organization_id=org_id,
+            name=campaign_name,
+            slug=campaign_slug,
+        )
+        .on_conflict_do_update(
+            index_elements=["organization_id", "slug"],
+            set_={"slug": Campaign.slug},
+        )
+        .returning(Campaign.id)
+        .cte("upsert_campaign")
+    )
+    creator_id, campaign_id = (await db.execute(
+        select(creator_cte.c.id, campaign_cte.c.id)
+    )).one()
+    return creator_id, campaign_id
 
 
 # --- Endpoint ---
 
-@router.post("/quick", response_model=QuickLinkResponse, status_code=201)
+@router.post("/quick", response_class=ORJSONResponse, responses={201: {"model": QuickLinkResponse}}, status_code=201)
 async def create_quick_link(
     req: QuickLinkRequest,
     auth: AuthContext = Depends(require_secret_key),
     db: AsyncSession = Depends(get_db),
 ):
-    rate_limit_api_key(str(auth.key_id))
-    settings = get_settings()
+    rate_limit_api_key(auth.key_id_str)
 
-    _validate_destination_url(req.destination_url)
+    validate_destination_url(req.destination_url)
 
     creator_handle = _slugify(req.creator)
     campaign_slug = _slugify(req.campaign)
@@ -104,95 +155,83 @@ async def create_quick_link(
     if not campaign_slug:
         raise HTTPException(status_code=400, detail="Campaign name is required")
 
-    # --- Find or create creator ---
-    stmt = select(Creator).where(Creator.handle == creator_handle)
-    result = await db.execute(stmt)
-    creator = result.scalar_one_or_none()
-
-    if not creator:
-        creator = Creator(handle=creator_handle, display_name=req.creator.strip())
-        db.add(creator)
-        await db.flush()
-        logger.info("creator_auto_created", handle=creator_handle)
-
-    # --- Find or create campaign ---
-    stmt = select(Campaign).where(
-        Campaign.organization_id == auth.organization_id,
-        Campaign.slug == campaign_slug,
+    # --- Find or create creator + campaign ---
+    creator_id, campaign_id = await _resolve_creator_campaign(
+        db, auth.organization_id,
+        creator_handle, req.creator.strip(),
+        campaign_slug, req.campaign.strip(),
     )
-    result = await db.execute(stmt)
-    campaign = result.scalar_one_or_none()
 
-    if not campaign:
-        campaign = Campaign(
-            organization_id=auth.organization_id,
-            name=req.campaign.strip(),
-            slug=campaign_slug,
-        )
-        db.add(campaign)
-        await db.flush()
-        logger.info("campaign_auto_created", slug=campaign_slug)
-
-    # --- Find or create link ---
-    stmt = select(Link).where(
-        Link.creator_handle == creator_handle,
-        Link.campaign_slug == campaign_slug,
-        Link.asset_slug == asset_slug,
-    )
-    result = await db.execute(stmt)
-    existing = result.scalar_one_or_none()
-
-    if existing:
-        path = f"/c/{creator_handle}/{campaign_slug}"
-        if asset_slug:
-            path += f"/{asset_slug}"
-
-        return QuickLinkResponse(
-            wrapper_url=f"{settings.base_url}{path}",
-            destination_url=existing.destination_url,
-            creator=creator_handle,
-            campaign=campaign_slug,
-            asset=asset_slug,
-            has_deep_links=bool(existing.ios_deeplink or existing.android_deeplink or existing.universal_link),
-            param_overrides=existing.param_overrides,
-            status=existing.status,
-        )
-
-    # --- Create the link ---
-    link = Link(
-        organization_id=auth.organization_id,
-        creator_id=creator.id,
-        campaign_id=campaign.id,
-        creator_handle=creator_handle,
-        campaign_slug=campaign_slug,
-        asset_slug=asset_slug,
-        destination_url=req.destination_url.strip(),
-        ios_deeplink=req.ios_deeplink,
-        ios_fallback_url=req.ios_fallback_url,
-        android_deeplink=req.android_deeplink,
-        android_fallback_url=req.android_fallback_url,
-        universal_link=req.universal_link,
-        param_overrides=req.param_overrides,
-    )
-    db.add(link)
-    await db.commit()
-
-    path = f"/c/{creator_handle}/{campaign_slug}"
+    # --- Create the link, or fall back to the existing one on route conflict ---
+    try:
+        link_id = (await db.execute(
+            pg_insert(Link)
+            .values(
+                id=uuid4(),
+                organization_id=auth.organization_id,
+                creator_id=creator_id,
+                campaign_id=campaign_id,
+                creator_handle=creator_handle,
+                campaign_slug=campaign_slug,
+                asset_slug=asset_slug,
+                destination_url=req.destination_url.strip(),
+                ios_deeplink=req.ios_deeplink,
+                ios_fallback_url=req.ios_fallback_url,
+                android_deeplink=req.android_deeplink,
+                android_fallback_url=req.android_fallback_url,
+                universal_link=req.universal_link,
+                param_overrides=req.param_overrides,
+            )
+            .on_conflict_do_nothing()
+            .returning(Link.id)
+        )).scalar_one_or_none()
+    except IntegrityError:
+        # FK failure → a cached creator/campaign id has gone stale
+        _CREATOR_CACHE.pop(creator_handle, None)
+        _CAMPAIGN_CACHE.pop((auth.organization_id, campaign_slug), None)
+        raise
+    await commit_without_fsync(db)
+
+    # Only cache ids once they're committed
+    _CREATOR_CACHE[creator_handle] = creator_id
+    _CAMPAIGN_CACHE[(auth.organization_id, campaign_slug)] = campaign_id
+
+    parts = (_WRAPPER_PREFIX, creator_handle, "/", campaign_slug)
     if asset_slug:
-        path += f"/{asset_slug}"
-    wrapper_url = f"{settings.base_url}{path}"
+        parts += ("/", asset_slug)
+    wrapper_url = "".join(parts)
+
+    if link_id is None:
+        stmt = select(Link).where(
+            Link.creator_handle == creator_handle,
+            Link.campaign_slug == campaign_slug,
+            Link.asset_slug == asset_slug,
+        )
+        existing = (await db.execute(stmt)).scalar_one()
+
+        return ORJSONResponse(status_code=201, content={
+            "wrapper_url": wrapper_url,
+            "destination_url": existing.destination_url,
+            "creator": creator_handle,
+            "campaign": campaign_slug,
+            "asset": asset_slug,
+            "has_deep_links": bool(existing.ios_deeplink or existing.android_deeplink or existing.universal_link),
+            "param_overrides": existing.param_overrides,
+            "status": existing.status,
+        })
 
     logger.info("quick_link_created", wrapper_url=wrapper_url, creator=creator_handle,
-                campaign=campaign_slug, org=str(auth.organization_id),
+                campaign=campaign_slug, org=auth.organization_id_str,
                 deep_links=bool(req.ios_deeplink or req.android_deeplink))
 
-    return QuickLinkResponse(
-        wrapper_url=wrapper_url,
-        destination_url=req.destination_url.strip(),
-        creator=creator_handle,
-        campaign=campaign_slug,
-        asset=asset_slug,
-        has_deep_links=bool(req.ios_deeplink or req.android_deeplink or req.universal_link),
-        param_overrides=req.param_overrides,
-        status="active",
-    )
+    # Returned as a Response so FastAPI skips jsonable_encoder; orjson does it in one pass
+    return ORJSONResponse(status_code=201, content={
+        "wrapper_url": wrapper_url,
+        "destination_url": req.destination_url.strip(),
+        "creator": creator_handle,
+        "campaign": campaign_slug,
+        "asset": asset_slug,
+        "has_deep_links": bool(req.ios_deeplink or req.android_deeplink or req.universal_link),
+        "param_overrides": req.param_overrides,
+        "status": "active",
+    })
@@ -17,7 +17,7 @@ Flow:
   3. Analyze referrer + UA
   4. Capture sec-fetch, platform params, all headers
   5. Build destination URL with injected params
-  6. Create click event in DB with timing
+  6. Create click event in DB with timing (batched for ?nocollect=1)
   7. Log to firehose
   8. Set cookies (click_id + session_id)
   9. If ?nocollect=1 → direct 302
@@ -26,67 +26,108 @@ Flow:
 
 import asyncio
 import hashlib
+import secrets
 import time
-import uuid
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 from urllib.parse import quote
 
 from fastapi import APIRouter, Depends, HTTPException, Request
 from fastapi.responses import RedirectResponse
-from sqlalchemy import select, func
+from sqlalchemy import bindparam, func, insert, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config import get_settings
 from app.core.bot_detection import score_request
 from app.core.click_id import mint_click_id
+from app.core.click_log import pack_server_received
+from app.core.event_buffer import event_buffer
+from app.core import link_cache
+from app.core.geo import geo_lookup
 from app.core.referrer_intelligence import analyze_click
 from app.core.param_injection import resolve_destination, extract_platform_params
-from app.models.database import get_db
+from app.models.database import get_db, open_session
 from app.models.tables import ClickEvent, ClickEventLog, Link
 from app.services.pixel_fire import fire_pixels_for_click
-from app.middleware.rate_limit import rate_limit_ip, rate_limit_link, check_dedupe
+from app.middleware.rate_limit import check_dedupe, get_client_ip, rate_limit_ip, rate_limit_link
 
 import structlog
 
 logger = structlog.get_logger()
 router = APIRouter()
 
-
-def _get_real_ip(request: Request) -> str:
-    """Extract real client IP from x-forwarded-for or request."""
-    forwarded = request.headers.get("x-forwarded-for")
-    if forwarded:
-        # First IP in chain is the client
-        ips = [ip.strip() for ip in forwarded.split(",")]
-        for ip in ips:
-            # Skip private ranges
-            if not ip.startswith(("10.", "172.16.", "172.17.", "172.18.", "172.19.",
-                                  "172.20.", "172.21.", "172.22.", "172.23.", "172.24.",
-                                  "172.25.", "172.26.", "172.27.", "172.28.", "172.29.",
-                                  "172.30.", "172.31.", "192.168.", "127.", "::1")):
-                return ip
-        return ips[0]
-    return request.client.host if request.client else "unknown"
-
-
-def _geo_lookup(ip: str) -> dict:
-    """
-    Geo lookup from IP. Returns dict with country, region, city, asn, isp.
-    Stub — returns empty until MaxMind is configured.
-    To enable: pip install geoip2, download GeoLite2 DBs, set SF_GEOIP_PATH.
-    """
-    # TODO: implement with MaxMind GeoLite2
-    # import geoip2.database
-    # reader = geoip2.database.Reader(settings.geoip_path)
-    # response = reader.city(ip)
-    # return { "country_code": response.country.iso_code, ... }
-    return {
-        "country_code": None,
-        "region": None,
-        "city": None,
-        "asn": None,
-        "isp": None,
-    }
+# Settings are fixed for the process lifetime — read what the click path needs once
+_BOT_FLAG_THRESHOLD: float = get_settings().bot_risk_flag_threshold
+_PIXEL_PAGE_PREFIX: str = get_settings().base_url + "/v1/px/"
+_SECURE_COOKIES: bool = not get_settings().debug
+
+
+def _cookie_suffix(max_age: int) -> str:
+    # Same attributes, same order as Starlette's set_cookie
+    return f"; HttpOnly; Max-Age={max_age}; Path=/; SameSite=lax" + ("; Secure" if _SECURE_COOKIES else "")
+
+
+# Cookie attributes never change, so the Set-Cookie tail is formatted once.
+# Values are click/session ids (hex / UUID text) — nothing to quote.
+_CLICK_COOKIE_SUFFIX = _cookie_suffix(604800)      # 7 days
+_SESSION_COOKIE_SUFFIX = _cookie_suffix(2592000)   # 30 days
+
+# Link lookup built once at import: a plain row of the columns the click
+# path reads (attribute access matches the ORM object) — no identity map,
+# no full-entity hydration. The route is covered by ix_links_route_lookup /
+# uq_links_route_no_asset; a NULL asset needs IS NULL, hence two statements.
+_LINK_COLUMNS = (
+    Link.id, Link.organization_id, Link.creator_id, Link.campaign_id,
+    Link.creator_handle, Link.campaign_slug, Link.asset_slug,
+    Link.destination_url, Link.param_overrides,
+    Link.ios_deeplink, Link.ios_fallback_url,
+    Link.android_deeplink, Link.android_fallback_url, Link.universal_link,
+)
+_LINK_LOOKUP_NO_ASSET = select(*_LINK_COLUMNS).where(
+    Link.creator_handle == bindparam("creator_handle"),
+    Link.campaign_slug == bindparam("campaign_slug"),
+    Link.asset_slug.is_(None),
+    Link.status == "active",
+)
+_LINK_LOOKUP = select(*_LINK_COLUMNS).where(
+    Link.creator_handle == bindparam("creator_handle"),
+    Link.campaign_slug == bindparam("campaign_slug"),
+    Link.asset_slug == bindparam("asset_slug"),
+    Link.status == "active",
+)
+
+# Core inserts against the fixed click tables — the row dicts bind straight
+# to the cached compiled statement, skipping ORM instance construction,
+# attribute instrumentation and the unit-of-work flush on the hot path.
+_INSERT_CLICK = insert(ClickEvent.__table__)
+_INSERT_CLICK_LOG = insert(ClickEventLog.__table__)
+
+
+def _clip(value: str | None, max_length: int) -> str | None:
+    """Client-controlled text → fits its String(n) column instead of failing the INSERT."""
+    return value[:max_length] if value else value
+
+
+async def _lookup_link(db: AsyncSession, creator_handle: str, campaign_slug: str, asset_slug: str | None):
+    """Active link for a route — Redis first, so hot campaigns skip Postgres."""
+    link = await link_cache.get(creator_handle, campaign_slug, asset_slug)
+    if link is None:
+        params = {"creator_handle": creator_handle, "campaign_slug": campaign_slug}
+        if asset_slug is None:
+            stmt = _LINK_LOOKUP_NO_ASSET
+        else:
+            stmt = _LINK_LOOKUP
+            params["asset_slug"] = asset_slug
+        link = (await db.execute(stmt, params)).one_or_none()
+        if link is not None:
+            await link_cache.put(link)
+    return link
+
+
+async def _count_session_clicks(session_id: str) -> int:
+    async with open_session() as session:
+        return (await session.execute(
+            select(func.count()).select_from(ClickEvent).where(ClickEvent.session_id == session_id)
+        )).scalar() or 0
 
 
 @router.get("/c/{creator_handle}/{campaign_slug}")
@@ -98,61 +139,68 @@ async def redirect_click(
     asset_slug: str | None = None,
     db: AsyncSession = Depends(get_db),
 ):
+    # One wall-clock read per click; responded_at is derived from the monotonic delta
     server_start = time.monotonic()
-    settings = get_settings()
+    received_at = datetime.now(timezone.utc)
 
     # --- Rate limiting ---
     rate_limit_ip(request)
     rate_limit_link(request, creator_handle, campaign_slug)
 
-    # --- 1. Look up link ---
-    stmt = select(Link).where(
-        Link.creator_handle == creator_handle,
-        Link.campaign_slug == campaign_slug,
-        Link.asset_slug == asset_slug,
-        Link.status == "active",
-    )
-    result = await db.execute(stmt)
-    link = result.scalar_one_or_none()
+    # --- 1. Look up link, overlapped with the repeat-visit count ---
+    # The count only needs the session cookie, so it runs on its own
+    # session concurrently with the link lookup instead of after it.
+    session_id = request.cookies.get("inf_session_id")
+    if session_id and len(session_id) > 100:
+        session_id = None  # not one we minted — start a fresh session
+    if session_id:
+        link, prior_clicks = await asyncio.gather(
+            _lookup_link(db, creator_handle, campaign_slug, asset_slug),
+            _count_session_clicks(session_id),
+        )
+    else:
+        link = await _lookup_link(db, creator_handle, campaign_slug, asset_slug)
+        prior_clicks = 0
 
     if not link:
         raise HTTPException(status_code=404, detail="Not found")
 
     # --- 2. Bot detection ---
-    ua = request.headers.get("user-agent")
-    headers_dict = dict(request.headers)
+    # Starlette's Headers is already a case-insensitive mapping — pass it through
+    headers = request.headers
+    ua = headers.get("user-agent")
 
     verdict = score_request(
         user_agent=ua,
-        headers=headers_dict,
+        headers=headers,
         asn=None,
         rate_limited=False,
     )
 
     if verdict.should_block:
         logger.warning("bot_blocked", creator=creator_handle, campaign=campaign_slug,
-                       reason=verdict.reason, ip=_get_real_ip(request))
+                       reason=verdict.reason, ip=get_client_ip(request))
         raise HTTPException(status_code=404, detail="Not found")
 
     # --- Dedupe check ---
-    ip = _get_real_ip(request)
+    ip = get_client_ip(request)
     slug = f"{creator_handle}/{campaign_slug}"
     is_dedupe = check_dedupe(ip, slug, ua or "")
-    is_suspected_bot = verdict.risk_score >= settings.bot_risk_flag_threshold or is_dedupe
+    is_suspected_bot = verdict.risk_score >= _BOT_FLAG_THRESHOLD or is_dedupe
     bot_reason = None
     if is_dedupe:
         bot_reason = "dedupe_3s"
-    elif verdict.risk_score >= settings.bot_risk_flag_threshold:
+    elif verdict.risk_score >= _BOT_FLAG_THRESHOLD:
         bot_reason = verdict.reason
 
     # --- 3. Capture query params + sec-fetch (needed for intelligence) ---
     all_query_params = dict(request.query_params)
     platform_params = extract_platform_params(all_query_params)
 
-    sec_fetch_site = request.headers.get("sec-fetch-site")
-    sec_fetch_mode = request.headers.get("sec-fetch-mode")
-    sec_fetch_dest = request.headers.get("sec-fetch-dest")
-    sec_fetch_user = request.headers.get("sec-fetch-user")
+    sec_fetch_site = _clip(request.headers.get("sec-fetch-site"), 50)
+    sec_fetch_mode = _clip(request.headers.get("sec-fetch-mode"), 50)
+    sec_fetch_dest = _clip(request.headers.get("sec-fetch-dest"), 50)
+    sec_fetch_user = _clip(request.headers.get("sec-fetch-user"), 10)
 
     # --- 4. Analyze click (referrer intelligence — full priority chain) ---
     referer = request.headers.get("referer")
@@ -162,7 +210,7 @@ async def redirect_click(
         user_agent=ua,
         referer=referer,
         accept_language=accept_lang,
-        headers=headers_dict,
+        headers=headers,
         query_params=all_query_params,
     )
 
@@ -170,21 +218,14 @@ async def redirect_click(
     click_id = mint_click_id()
 
     # --- 7. Session cookie (for repeat visit stitching) ---
-    session_id = request.cookies.get("inf_session_id")
     new_session = False
     if not session_id:
-        session_id = uuid.uuid4().hex
+        session_id = secrets.token_hex(16)
         new_session = True
 
-    # --- 7b. Repeat visitor + click number ---
+    # --- 7b. Repeat visitor + click number (counted in step 1) ---
     is_repeat_visitor = not new_session
-    click_number = 1
-    if not new_session:
-        count_stmt = select(func.count()).select_from(ClickEvent).where(
-            ClickEvent.session_id == session_id
-        )
-        count_result = await db.execute(count_stmt)
-        click_number = (count_result.scalar() or 0) + 1
+    click_number = prior_clicks + 1
 
     # --- 8. Resolve destination ---
     final_url, injected_params = resolve_destination(
@@ -197,7 +238,7 @@ async def redirect_click(
         os_family=intel.os_family,
         platform_params=platform_params,
         referrer=referer,
-        request_headers=headers_dict,
+        request_headers=headers,
     )
 
     # Extract UTM subset
@@ -214,12 +255,10 @@ async def redirect_click(
     }
 
     # --- 9. Geo lookup ---
-    geo = _geo_lookup(ip)
+    geo = geo_lookup(ip, request.state.client_ip_addr)
 
     # --- 10. Create click event ---
-    now = datetime.now(timezone.utc)
-
-    click_event = ClickEvent(
+    click_row = dict(
         click_id=str(click_id),
         session_id=session_id,
         link_id=link.id,
@@ -243,10 +282,12 @@ async def redirect_click(
         # Source intelligence
         source_platform=intel.source_platform,
         source_medium=intel.source_medium,
+        source_platform_id=intel.source_platform_id,
+        source_medium_id=intel.source_medium_id,
         source_detail=intel.source_detail,
         is_in_app_browser=intel.is_in_app_browser,
         in_app_platform=intel.in_app_platform,
-        referer_domain=intel.referer_domain,
+        referer_domain=_clip(intel.referer_domain, 255),
 
         # Network
         ip_address=ip,
@@ -264,10 +305,11 @@ async def redirect_click(
 
         # Device
         device_class=intel.device_class,
-        os_family=intel.os_family,
-        os_version=intel.os_version,
-        browser_family=intel.browser_family,
-        browser_version=intel.browser_version,
+        device_class_id=intel.device_class_id,
+        os_family=_clip(intel.os_family, 50),
+        os_version=_clip(intel.os_version, 20),
+        browser_family=_clip(intel.browser_family, 50),
+        browser_version=_clip(intel.browser_version, 20),
         is_mobile=intel.is_mobile,
 
         # Geo
@@ -278,8 +320,8 @@ async def redirect_click(
         isp=geo["isp"],
 
         # Language
-        language=intel.language,
-        locale=intel.locale,
+        language=_clip(intel.language, 10),
+        locale=_clip(intel.locale, 10),
 
         # Server-side headers
         accept_language_full=request.headers.get("accept-language"),
@@ -295,18 +337,9 @@ async def redirect_click(
         bot_blocked=False,
         is_suspected_bot=is_suspected_bot,
         bot_reason=bot_reason,
+        bot_signals_mask=verdict.signals.to_mask(dedupe_hit=is_dedupe),
+        # Non-boolean extras only — flags live in the mask, sec-fetch in its columns
         bot_signals={
-            "ua_blocked": verdict.signals.ua_blocked,
-            "ua_is_known_bot": verdict.signals.ua_is_known_bot,
-            "missing_accept_language": verdict.signals.missing_accept_language,
-            "missing_sec_fetch": verdict.signals.missing_sec_fetch,
-            "is_datacenter_ip": verdict.signals.is_datacenter_ip,
-            "rate_limited": verdict.signals.rate_limited,
-            "dedupe_hit": is_dedupe,
-            "sec_fetch_site": sec_fetch_site,
-            "sec_fetch_mode": sec_fetch_mode,
-            "sec_fetch_dest": sec_fetch_dest,
-            "sec_fetch_user": sec_fetch_user,
             # Privacy signals
             "dnt": request.headers.get("dnt"),
             "sec_gpc": request.headers.get("sec-gpc"),
@@ -323,38 +356,39 @@ async def redirect_click(
         },
 
         # Timing
-        server_received_at=now,
+        server_received_at=received_at,
     )
-    db.add(click_event)
 
     # --- 11. Log to firehose ---
-    db.add(ClickEventLog(
+    log_row = dict(
         click_id=str(click_id),
         event_type="server_received",
-        payload={
-            "ip": ip,
-            "ua": ua[:200] if ua else None,
-            "referer": referer[:500] if referer else None,
-            "platform_params": list(platform_params.keys()) if platform_params else [],
-            "source": intel.source_platform,
-            "risk": verdict.risk_score,
-            "sec_fetch": {
-                "site": sec_fetch_site,
-                "mode": sec_fetch_mode,
-                "dest": sec_fetch_dest,
-                "user": sec_fetch_user,
-            },
-            "session_id": session_id,
-            "new_session": new_session,
-        },
-    ))
+        payload_packed=pack_server_received(
+            ip=ip,
+            ua=ua,
+            referer=referer,
+            platform_params=list(platform_params.keys()) if platform_params else [],
+            source=intel.source_platform,
+            risk=verdict.risk_score,
+            sec_fetch=(sec_fetch_site, sec_fetch_mode, sec_fetch_dest, sec_fetch_user),
+            session_id=session_id,
+            new_session=new_session,
+        ),
+    )
 
-    await db.commit()
+    # Timing is stamped in memory so the click lands in a single commit
+    server_elapsed = time.monotonic() - server_start
+    server_elapsed_ms = int(server_elapsed * 1000)
+    click_row["server_responded_at"] = received_at + timedelta(seconds=server_elapsed)
 
-    # Update server_responded_at (timing)
-    server_elapsed_ms = int((time.monotonic() - server_start) * 1000)
-    click_event.server_responded_at = datetime.now(timezone.utc)
-    await db.commit()
+    # Direct redirects have no collector hop reading the click back, so the
+    # write can go through the batched event buffer. The pixel-page hop looks
+    # the click up immediately — persist inline there, or if the buffer is full.
+    nocollect = request.query_params.get("nocollect") == "1"
+    if not (nocollect and event_buffer.try_put_many(((ClickEvent, click_row), (ClickEventLog, log_row)))):
+        await db.execute(_INSERT_CLICK, click_row)
+        await db.execute(_INSERT_CLICK_LOG, log_row)
+        await db.commit()
 
     # --- Fire server-side pixels (non-blocking) ---
     asyncio.create_task(
@@ -381,37 +415,18 @@ async def redirect_click(
                 elapsed_ms=server_elapsed_ms)
 
     # --- 12. Set cookies + redirect ---
-    nocollect = request.query_params.get("nocollect") == "1"
-
     if nocollect:
         response = RedirectResponse(url=final_url, status_code=302)
     else:
         # Redirect through pixel fire page (fires browser pixels + then JS redirects)
-        pixel_page_url = f"{settings.base_url}/v1/px/{click_id}?dst={quote(final_url, safe='')}"
+        pixel_page_url = f"{_PIXEL_PAGE_PREFIX}{click_id}?dst={quote(final_url, safe='')}"
         response = RedirectResponse(url=pixel_page_url, status_code=302)
 
     # Click ID cookie (7 days)
-    is_secure = not settings.debug
-    response.set_cookie(
-        key="inf_click_id",
-        value=str(click_id),
-        max_age=604800,
-        path="/",
-        samesite="lax",
-        secure=is_secure,
-        httponly=True,
-    )
+    response.raw_headers.append((b"set-cookie", f"inf_click_id={click_id}{_CLICK_COOKIE_SUFFIX}".encode()))
 
     # Session cookie (30 days — stitches repeat clicks from same visitor)
     if new_session:
-        response.set_cookie(
-            key="inf_session_id",
-            value=session_id,
-            max_age=2592000,     # 30 days
-            path="/",
-            samesite="lax",
-            secure=is_secure,
-            httponly=True,
-        )
+        response.raw_headers.append((b"set-cookie", f"inf_session_id={session_id}{_SESSION_COOKIE_SUFFIX}".encode()))
 
     return response
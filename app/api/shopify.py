@@ -5,17 +5,22 @@ Webhook endpoints use Shopify's HMAC-SHA256 authentication (no API key needed).
 The connect endpoint requires a secret API key (sf_sec_*).
 """
 
+import asyncio
 import base64
 import hashlib
 import hmac
 import math
 import secrets
+from functools import lru_cache
+from typing import NamedTuple
 from uuid import UUID
 
 import httpx
+import orjson
+from cachetools import TTLCache
 from fastapi import APIRouter, Depends, HTTPException, Request
 from pydantic import BaseModel
-from sqlalchemy import select
+from sqlalchemy import exists, false, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config import get_settings
@@ -34,45 +39,87 @@ router = APIRouter(prefix="/v1/shopify", tags=["shopify"])
 # Helpers
 # ---------------------------------------------------------------------------
 
-def _verify_shopify_hmac(body: bytes, secret: str, hmac_header: str) -> bool:
-    """Validate X-Shopify-Hmac-Sha256 against the raw request body."""
-    digest = hmac.new(
-        secret.encode("utf-8"),
-        body,
-        hashlib.sha256,
-    ).digest()
-    computed = base64.b64encode(digest).decode("utf-8")
-    return hmac.compare_digest(computed, hmac_header)
+@lru_cache(maxsize=1024)
+def _shopify_hmac_template(secret: str) -> hmac.HMAC:
+    """Keyed HMAC state per store secret — copying it skips the ipad/opad
+    key setup on every webhook."""
+    return hmac.new(secret.encode("utf-8"), digestmod=hashlib.sha256)
+
+
+def _hmac_matches(mac: hmac.HMAC, hmac_header: str) -> bool:
+    # Compare as bytes; headers are latin-1 text, so this encode can't fail
+    return hmac.compare_digest(base64.b64encode(mac.digest()), hmac_header.encode("latin-1"))
+
+
+async def _read_signed_body(request: Request, secret: str) -> tuple[bytes, bool]:
+    """Read the webhook body and validate X-Shopify-Hmac-Sha256 against it,
+    hashing each chunk as it arrives so the HMAC is done when the last byte
+    is. Returns (body, signature_ok)."""
+    mac = _shopify_hmac_template(secret).copy()
+    body = bytearray()
+    async for chunk in request.stream():
+        mac.update(chunk)
+        body += chunk
+    return bytes(body), _hmac_matches(mac, request.headers.get("X-Shopify-Hmac-Sha256", ""))
 
 
 def _extract_click_id_from_note_attributes(note_attributes: list[dict] | None) -> str | None:
     """Parse Shopify's note_attributes array for inf_click_id."""
     if not note_attributes:
         return None
-    for attr in note_attributes:
-        if attr.get("name") == "inf_click_id":
-            value = attr.get("value")
-            if value and isinstance(value, str) and value.strip():
-                return value.strip()
-    return None
+    values = (attr.get("value") for attr in note_attributes if attr.get("name") == "inf_click_id")
+    return next((v.strip() for v in values if isinstance(v, str) and v.strip()), None)
 
 
 def _shopify_money_to_cents(amount: str) -> int:
-    """Convert Shopify money string like '29.99' to integer cents 2999."""
+    """Convert Shopify money string like '29.99' to integer cents 2999.
+
+    Shopify sends plain decimal strings with at most two places; those are
+    parsed as integers — exact, no float round trip. Anything else
+    (exponents, extra precision, non-strings) takes the float path.
+    """
+    if isinstance(amount, str):
+        whole, _, frac = amount.partition(".")
+        negative = whole.startswith("-")
+        if negative:
+            whole = whole[1:]
+        if whole.isdecimal() and len(frac) <= 2 and (not frac or frac.isdecimal()):
+            cents = int(whole) * 100 + int(frac.ljust(2, "0"))
+            return -cents if negative else cents
     try:
         return int(round(float(amount) * 100))
     except (ValueError, TypeError):
         return 0
 
 
-async def _get_store_by_domain(db: AsyncSession, shop_domain: str) -> ShopifyStore | None:
+class _StoreAuth(NamedTuple):
+    """The fields a webhook needs from its ShopifyStore."""
+    id: UUID
+    organization_id: UUID
+    webhook_secret: str
+
+
+# shop_domain → _StoreAuth. Stores are effectively immutable on webhook
+# timescales; only hits are cached, so a newly connected store is seen at once.
+_store_cache: TTLCache = TTLCache(maxsize=1024, ttl=60)
+
+
+async def _get_store_by_domain(db: AsyncSession, shop_domain: str) -> _StoreAuth | None:
     """Look up an active ShopifyStore by domain."""
+    cached = _store_cache.get(shop_domain)
+    if cached is not None:
+        return cached
     stmt = select(ShopifyStore).where(
         ShopifyStore.shop_domain == shop_domain,
         ShopifyStore.is_active == True,
     )
     result = await db.execute(stmt)
-    return result.scalar_one_or_none()
+    store = result.scalar_one_or_none()
+    if store is None:
+        return None
+    auth = _StoreAuth(store.id, store.organization_id, store.webhook_secret)
+    _store_cache[shop_domain] = auth
+    return auth
 
 
 # ---------------------------------------------------------------------------
@@ -84,24 +131,22 @@ async def webhook_orders_create(
     request: Request,
     db: AsyncSession = Depends(get_db),
 ):
-    body = await request.body()
-
-    # --- Identify the store ---
+    # --- Identify the store (headers only — its secret keys the body hash) ---
     shop_domain = request.headers.get("X-Shopify-Shop-Domain", "")
     store = await _get_store_by_domain(db, shop_domain)
     if not store:
         logger.warning("shopify_webhook_unknown_store", shop_domain=shop_domain)
         return {"status": "ignored", "reason": "unknown_store"}
 
-    # --- Verify HMAC ---
-    hmac_header = request.headers.get("X-Shopify-Hmac-Sha256", "")
-    if not _verify_shopify_hmac(body, store.webhook_secret, hmac_header):
+    # --- Read body + verify HMAC ---
+    body, signed = await _read_signed_body(request, store.webhook_secret)
+    if not signed:
         raise HTTPException(status_code=401, detail="Invalid HMAC signature.")
 
     # --- Parse order ---
     try:
-        order = await request.json()
-    except Exception:
+        order = orjson.loads(body)
+    except orjson.JSONDecodeError:
         raise HTTPException(status_code=400, detail="Invalid JSON body.")
 
     shopify_order_id = order.get("id")
@@ -126,7 +171,7 @@ async def webhook_orders_create(
         return {"status": "ignored", "reason": "invalid_click_id"}
 
     # --- Idempotency: check if conversion already exists ---
-    existing_stmt = select(ConversionEvent).where(ConversionEvent.order_id == order_id)
+    existing_stmt = select(ConversionEvent.id).where(ConversionEvent.order_id == order_id).limit(1)
     existing = await db.execute(existing_stmt)
     if existing.scalar_one_or_none():
         logger.info("shopify_order_duplicate", order_id=order_id)
@@ -173,24 +218,22 @@ async def webhook_orders_refund(
     request: Request,
     db: AsyncSession = Depends(get_db),
 ):
-    body = await request.body()
-
-    # --- Identify the store ---
+    # --- Identify the store (headers only — its secret keys the body hash) ---
     shop_domain = request.headers.get("X-Shopify-Shop-Domain", "")
     store = await _get_store_by_domain(db, shop_domain)
     if not store:
         logger.warning("shopify_refund_unknown_store", shop_domain=shop_domain)
         return {"status": "ignored", "reason": "unknown_store"}
 
-    # --- Verify HMAC ---
-    hmac_header = request.headers.get("X-Shopify-Hmac-Sha256", "")
-    if not _verify_shopify_hmac(body, store.webhook_secret, hmac_header):
+    # --- Read body + verify HMAC ---
+    body, signed = await _read_signed_body(request, store.webhook_secret)
+    if not signed:
         raise HTTPException(status_code=401, detail="Invalid HMAC signature.")
 
     # --- Parse refund ---
     try:
-        refund = await request.json()
-    except Exception:
+        refund = orjson.loads(body)
+    except orjson.JSONDecodeError:
         raise HTTPException(status_code=400, detail="Invalid JSON body.")
 
     shopify_order_id = refund.get("order_id")
@@ -201,34 +244,40 @@ async def webhook_orders_refund(
     order_id = f"shopify:{shopify_order_id}"
     refund_order_id = f"shopify_refund:{shopify_refund_id}" if shopify_refund_id else None
 
-    # --- Find original ConversionEvent ---
-    conv_stmt = select(ConversionEvent).where(ConversionEvent.order_id == order_id)
-    conv_result = await db.execute(conv_stmt)
-    original_conversion = conv_result.scalar_one_or_none()
+    # --- Find original ConversionEvent + idempotency, one round trip ---
+    already_refunded = (
+        exists().where(RefundEvent.original_order_id == refund_order_id)
+        if refund_order_id else false()
+    )
+    conv_stmt = select(
+        ConversionEvent.click_id,
+        ConversionEvent.organization_id,
+        already_refunded.label("duplicate"),
+    ).where(ConversionEvent.order_id == order_id).limit(1)
+    original_conversion = (await db.execute(conv_stmt)).one_or_none()
 
     if not original_conversion:
         # No attributed conversion for this order — ignore
         logger.debug("shopify_refund_no_conversion", order_id=order_id)
         return {"status": "ignored", "reason": "no_original_conversion"}
 
-    # --- Idempotency: check if refund already exists ---
-    if refund_order_id:
-        existing_stmt = select(RefundEvent).where(RefundEvent.original_order_id == refund_order_id)
-        existing = await db.execute(existing_stmt)
-        if existing.scalar_one_or_none():
-            logger.info("shopify_refund_duplicate", refund_id=refund_order_id)
-            return {"status": "duplicate", "refund_id": refund_order_id}
+    if original_conversion.duplicate:
+        logger.info("shopify_refund_duplicate", refund_id=refund_order_id)
+        return {"status": "duplicate", "refund_id": refund_order_id}
 
     # --- Calculate refund amount ---
-    refund_amount_cents = 0
-    for transaction in refund.get("transactions", []):
-        if transaction.get("kind") == "refund":
-            refund_amount_cents += _shopify_money_to_cents(transaction.get("amount", "0"))
+    refund_amount_cents = sum(
+        _shopify_money_to_cents(t.get("amount", "0"))
+        for t in refund.get("transactions", [])
+        if t.get("kind") == "refund"
+    )
 
     # Fallback: if no transactions, sum refund_line_items
     if refund_amount_cents == 0:
-        for line in refund.get("refund_line_items", []):
-            refund_amount_cents += _shopify_money_to_cents(line.get("subtotal", "0"))
+        refund_amount_cents = sum(
+            _shopify_money_to_cents(line.get("subtotal", "0"))
+            for line in refund.get("refund_line_items", [])
+        )
 
     # --- Create RefundEvent ---
     event = RefundEvent(
@@ -269,64 +318,65 @@ async def connect_shopify_store(
     settings = get_settings()
     shop_domain = payload.shop_domain.strip().lower()
 
-    # --- Validate access token against Shopify Admin API ---
-    async with httpx.AsyncClient() as client:
+    # One client for the whole connect flow: the validation call and the
+    # webhook registrations share its pooled TLS connection to the shop.
+    async with httpx.AsyncClient(
+        base_url=f"https://{shop_domain}/admin/api/{settings.shopify_api_version}",
+        headers={"X-Shopify-Access-Token": payload.access_token},
+        timeout=10.0,
+    ) as client:
+        # --- Validate access token against Shopify Admin API ---
         try:
-            resp = await client.get(
-                f"https://{shop_domain}/admin/api/{settings.shopify_api_version}/shop.json",
-                headers={"X-Shopify-Access-Token": payload.access_token},
-                timeout=10.0,
-            )
+            resp = await client.get("/shop.json")
         except httpx.RequestError as e:
             raise HTTPException(status_code=400, detail=f"Cannot reach Shopify store: {e}")
 
-    if resp.status_code != 200:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Shopify returned {resp.status_code}. Check shop_domain and access_token.",
-        )
+        if resp.status_code != 200:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Shopify returned {resp.status_code}. Check shop_domain and access_token.",
+            )
 
-    # --- Check if store already connected ---
-    existing_stmt = select(ShopifyStore).where(ShopifyStore.shop_domain == shop_domain)
-    existing_result = await db.execute(existing_stmt)
-    existing_store = existing_result.scalar_one_or_none()
+        # --- Check if store already connected ---
+        existing_stmt = select(ShopifyStore).where(ShopifyStore.shop_domain == shop_domain)
+        existing_result = await db.execute(existing_stmt)
+        existing_store = existing_result.scalar_one_or_none()
 
-    if existing_store:
-        raise HTTPException(
-            status_code=409,
-            detail=f"Store {shop_domain} is already connected.",
-        )
+        if existing_store:
+            raise HTTPException(
+                status_code=409,
+                detail=f"Store {shop_domain} is already connected.",
+            )
 
-    # --- Generate webhook secret ---
-    webhook_secret = secrets.token_urlsafe(32)
+        # --- Generate webhook secret ---
+        webhook_secret = secrets.token_urlsafe(32)
 
-    # --- Store access token (base64 for v1 — TODO: Fernet/KMS) ---
-    access_token_encrypted = base64.b64encode(payload.access_token.encode()).decode()
+        # --- Store access token (base64 for v1 — TODO: Fernet/KMS) ---
+        access_token_encrypted = base64.b64encode(payload.access_token.encode()).decode()
 
-    # --- Create ShopifyStore record ---
-    store = ShopifyStore(
-        organization_id=auth.organization_id,
-        shop_domain=shop_domain,
-        access_token_encrypted=access_token_encrypted,
-        webhook_secret=webhook_secret,
-        is_active=True,
-    )
-    db.add(store)
-    await db.flush()  # get store.id before registering webhooks
-
-    # --- Register webhooks with Shopify ---
-    webhook_base = f"{settings.base_url}/v1/shopify/webhooks"
-    webhooks_to_register = [
-        {"topic": "orders/create", "address": f"{webhook_base}/orders-create"},
-        {"topic": "refunds/create", "address": f"{webhook_base}/orders-refund"},
-    ]
-
-    async with httpx.AsyncClient() as client:
-        for wh in webhooks_to_register:
-            try:
-                resp = await client.post(
-                    f"https://{shop_domain}/admin/api/{settings.shopify_api_version}/webhooks.json",
-                    headers={"X-Shopify-Access-Token": payload.access_token},
+        # --- Create ShopifyStore record ---
+        store = ShopifyStore(
+            organization_id=auth.organization_id,
+            shop_domain=shop_domain,
+            access_token_encrypted=access_token_encrypted,
+            webhook_secret=webhook_secret,
+            is_active=True,
+        )
+        db.add(store)
+        await db.flush()  # get store.id before registering webhooks
+
+        # --- Register webhooks with Shopify ---
+        webhook_base = f"{settings.base_url}/v1/shopify/webhooks"
+        webhooks_to_register = [
+            {"topic": "orders/create", "address": f"{webhook_base}/orders-create"},
+            {"topic": "refunds/create", "address": f"{webhook_base}/orders-refund"},
+        ]
+
+        # Independent subscriptions — register them concurrently
+        responses = await asyncio.gather(
+            *(
+                client.post(
+                    "/webhooks.json",
                     json={
                         "webhook": {
                             "topic": wh["topic"],
@@ -334,24 +384,31 @@ async def connect_shopify_store(
                             "format": "json",
                         }
                     },
-                    timeout=10.0,
                 )
-                if resp.status_code not in (200, 201):
-                    logger.warning(
-                        "shopify_webhook_register_failed",
-                        topic=wh["topic"],
-                        status=resp.status_code,
-                        body=resp.text[:500],
-                    )
-            except httpx.RequestError as e:
-                logger.warning("shopify_webhook_register_error", topic=wh["topic"], error=str(e))
+                for wh in webhooks_to_register
+            ),
+            return_exceptions=True,
+        )
+        for wh, resp in zip(webhooks_to_register, responses):
+            if isinstance(resp, httpx.RequestError):
+                logger.warning("shopify_webhook_register_error", topic=wh["topic"], error=str(resp))
+            elif isinstance(resp, BaseException):
+                raise resp
+            elif resp.status_code not in (200, 201):
+                logger.warning(
+                    "shopify_webhook_register_failed",
+                    topic=wh["topic"],
+                    status=resp.status_code,
+                    body=resp.text[:500],
+                )
 
     await db.commit()
+    _store_cache.pop(shop_domain, None)
 
     logger.info(
         "shopify_store_connected",
         shop_domain=shop_domain,
-        org=str(auth.organization_id),
+        org=auth.organization_id_str,
     )
     return {
         "status": "ok",
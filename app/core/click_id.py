@@ -11,30 +11,50 @@ Downstream events referencing an invalid/expired click_id are non-billable.
 
 import hashlib
 import hmac
+import re
+import secrets
 import time
 import uuid
 from dataclasses import dataclass
+from functools import lru_cache
+
+from cachetools import TTLCache
 
 from app.config import get_settings
 
 
-def _uuid7() -> str:
-    """Generate a UUIDv7 (time-ordered) as hex string.
-    Falls back to uuid4 if uuid7 isn't available (Python <3.13)."""
-    try:
+# Settings are fixed for the process lifetime — read what minting needs once
+_SECRET: str = get_settings().click_id_secret
+_EXPIRY_SECONDS: int = get_settings().click_id_expiry_seconds
+
+
+if hasattr(uuid, "uuid7"):
+    def _uuid7() -> str:
+        """Generate a UUIDv7 (time-ordered) as hex string."""
         return uuid.uuid7().hex
-    except AttributeError:
-        # Pre-3.13: use uuid4 (still globally unique, just not time-sorted)
-        return uuid.uuid4().hex
+else:
+    def _uuid7() -> str:
+        """uuid7 isn't available (Python <3.14): 128 random bits as hex —
+        still globally unique, just not time-sorted. token_hex skips
+        building a throwaway UUID object."""
+        return secrets.token_hex(16)
+
+
+@lru_cache(maxsize=4)
+def _hmac_template(secret: str) -> hmac.HMAC:
+    """Keyed HMAC state for the (process-constant) secret — copying it
+    skips the ipad/opad key setup on every sign."""
+    return hmac.new(secret.encode(), digestmod=hashlib.sha256)
 
 
 def _sign(payload: str, secret: str) -> str:
     """HMAC-SHA256, truncated to 16 hex chars."""
-    sig = hmac.new(secret.encode(), payload.encode(), hashlib.sha256).hexdigest()
-    return sig[:16]
+    mac = _hmac_template(secret).copy()
+    mac.update(payload.encode())
+    return mac.hexdigest()[:16]
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class ClickId:
     uid: str
     expiry: int
@@ -50,37 +70,45 @@ class ClickId:
 
 def mint_click_id() -> ClickId:
     """Create a new signed click_id."""
-    settings = get_settings()
     uid = _uuid7()
-    expiry = int(time.time()) + settings.click_id_expiry_seconds
+    expiry = int(time.time()) + _EXPIRY_SECONDS
     payload = f"{uid}:{expiry}"
-    sig = _sign(payload, settings.click_id_secret)
+    sig = _sign(payload, _SECRET)
     return ClickId(uid=uid, expiry=expiry, signature=sig)
 
 
+# {32 hex uid}:{unix expiry}:{16 hex sig} — the only shape mint_click_id emits
+_CLICK_ID_RE = re.compile(r"([0-9a-f]{32}):([0-9]{1,12}):([0-9a-f]{16})")
+
+# raw click_id → verified ClickId. One click fans out into many pixel events;
+# only successes are cached so junk input can't churn the cache.
+_verified_cache: TTLCache = TTLCache(maxsize=50_000, ttl=300)
+
+
 def verify_click_id(raw: str) -> ClickId | None:
     """Parse and verify a click_id string.
     Returns ClickId if valid and not expired, else None."""
-    settings = get_settings()
-    parts = raw.split(":")
-    if len(parts) != 3:
+    cached = _verified_cache.get(raw)
+    if cached is not None:
+        return None if cached.is_expired else cached
+
+    # Reject anything not shaped like a minted id before hashing — crawlers
+    # and fuzzers send plenty of junk
+    match = _CLICK_ID_RE.fullmatch(raw)
+    if match is None:
         return None
+    uid, expiry_str, sig = match.groups()
+    expiry = int(expiry_str)
 
-    uid, expiry_str, sig = parts
-    try:
-        expiry = int(expiry_str)
-    except ValueError:
+    # Expired is rejected either way — no need to hash first
+    click = ClickId(uid=uid, expiry=expiry, signature=sig)
+    if click.is_expired:
         return None
 
     # Check signature
-    expected = _sign(f"{uid}:{expiry}", settings.click_id_secret)
+    expected = _sign(f"{uid}:{expiry}", _SECRET)
     if not hmac.compare_digest(sig, expected):
         return None
 
-    click = ClickId(uid=uid, expiry=expiry, signature=sig)
-
-    # Check expiry
-    if click.is_expired:
-        return None
-
+    _verified_cache[raw] = click
     return click
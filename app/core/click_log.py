@@ -0,0 +1,72 @@
+"""
+Compact encoding for server_received firehose rows.
+
+click_events_log.payload (JSONB) stores every key name in every row. The
+redirect writes one of these per click, so its payload goes to
+payload_packed (bytea) instead: a schema-version byte followed by an
+orjson array in fixed field order, with the common Sec-Fetch values
+interned as small ints. Unknown values are stored verbatim.
+
+unpack_payload() turns a packed row back into the old dict shape.
+"""
+
+import orjson
+
+_VERSION = 1
+
+_FIELDS_V1 = (
+    "ip", "ua", "referer", "platform_params", "source", "risk",
+    "sf_site", "sf_mode", "sf_dest", "sf_user", "session_id", "new_session",
+)
+
+_SEC_FETCH_SITE = ("cross-site", "same-site", "same-origin", "none")
+_SEC_FETCH_MODE = ("navigate", "no-cors", "cors", "same-origin", "websocket")
+_SEC_FETCH_DEST = ("document", "iframe", "empty", "image", "script", "style", "frame", "embed", "object")
+_SEC_FETCH_USER = ("?1", "?0")
+
+
+def _interner(values: tuple[str, ...]) -> dict[str, int]:
+    return {v: i for i, v in enumerate(values, start=1)}
+
+
+_INTERN = tuple(_interner(t) for t in (_SEC_FETCH_SITE, _SEC_FETCH_MODE, _SEC_FETCH_DEST, _SEC_FETCH_USER))
+_EXTERN = (_SEC_FETCH_SITE, _SEC_FETCH_MODE, _SEC_FETCH_DEST, _SEC_FETCH_USER)
+
+
+def pack_server_received(
+    ip: str,
+    ua: str | None,
+    referer: str | None,
+    platform_params: list[str],
+    source: str | None,
+    risk: float,
+    sec_fetch: tuple[str | None, str | None, str | None, str | None],
+    session_id: str,
+    new_session: bool,
+) -> bytes:
+    """sec_fetch is (site, mode, dest, user)."""
+    interned = [table.get(v, v) if v is not None else None for table, v in zip(_INTERN, sec_fetch)]
+    return bytes((_VERSION,)) + orjson.dumps([
+        ip,
+        ua[:200] if ua else None,
+        referer[:500] if referer else None,
+        platform_params,
+        source,
+        risk,
+        *interned,
+        session_id,
+        new_session,
+    ])
+
+
+def unpack_payload(packed: bytes) -> dict:
+    """Decode a payload_packed value into the legacy JSONB payload shape."""
+    if packed[0] != _VERSION:
+        raise ValueError(f"unknown click log payload version {packed[0]}")
+    row = dict(zip(_FIELDS_V1, orjson.loads(packed[1:])))
+    site, mode, dest, user = (
+        table[v - 1] if isinstance(v, int) else v
+        for table, v in zip(_EXTERN, (row.pop("sf_site"), row.pop("sf_mode"), row.pop("sf_dest"), row.pop("sf_user")))
+    )
+    row["sec_fetch"] = {"site": site, "mode": mode, "dest": dest, "user": user}
+    return row
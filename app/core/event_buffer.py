@@ -0,0 +1,144 @@
+"""
+Buffered event writer — batches append-only event inserts.
+
+Ingest endpoints enqueue row dicts and return 202 without waiting on the
+database. A single background task drains the queue: up to BATCH_SIZE rows
+or FLUSH_INTERVAL seconds, whichever comes first, then one multi-row INSERT
+per table and one commit — one WAL fsync for hundreds of events.
+
+If a batch INSERT fails, the batch is retried row by row (one savepoint per
+row) so a single bad row costs only itself; rows that still fail are logged
+and dropped.
+"""
+
+import asyncio
+import time
+from collections import defaultdict
+
+import structlog
+from sqlalchemy import insert
+
+from app.models.database import open_session
+
+logger = structlog.get_logger()
+
+BATCH_SIZE = 500
+FLUSH_INTERVAL = 0.05  # seconds
+QUEUE_MAXSIZE = 50_000
+
+# Queued by stop(): the writer flushes what it holds, then exits
+_STOP = object()
+
+
+class EventBuffer:
+    def __init__(self):
+        self._queue: asyncio.Queue | None = None
+        self._task: asyncio.Task | None = None
+
+    def _get_queue(self) -> asyncio.Queue:
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=QUEUE_MAXSIZE)
+        return self._queue
+
+    async def put(self, model, row: dict) -> None:
+        """Queue one row for `model`'s table. Blocks only if the queue is full (backpressure)."""
+        await self._get_queue().put((model.__table__, row))
+
+    def try_put_many(self, items) -> bool:
+        """Queue (model, row) pairs all-or-nothing without waiting.
+
+        Returns False, queueing nothing, if they don't all fit — the caller
+        should write them inline instead.
+        """
+        queue = self._get_queue()
+        if queue.maxsize - queue.qsize() < len(items):
+            return False
+        for model, row in items:
+            queue.put_nowait((model.__table__, row))
+        return True
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the writer and flush whatever is still queued.
+
+        The writer is signalled rather than cancelled, so a flush in flight
+        runs to completion instead of losing its batch.
+        """
+        queue = self._get_queue()
+        if self._task is not None:
+            await queue.put(_STOP)
+            await self._task
+            self._task = None
+        while not queue.empty():
+            await self._flush(self._drain_nowait(queue, BATCH_SIZE))
+
+    @staticmethod
+    def _drain_nowait(queue: asyncio.Queue, limit: int) -> list:
+        batch = []
+        while len(batch) < limit and not queue.empty():
+            batch.append(queue.get_nowait())
+        return batch
+
+    async def _run(self) -> None:
+        queue = self._get_queue()
+        while True:
+            item = await queue.get()
+            if item is _STOP:
+                return
+            batch = [item]
+            deadline = time.monotonic() + FLUSH_INTERVAL
+            while len(batch) < BATCH_SIZE:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+                if item is _STOP:
+                    await self._flush(batch)
+                    return
+                batch.append(item)
+            await self._flush(batch)
+
+    async def _flush(self, batch: list) -> None:
+        if not batch:
+            return
+        by_table = defaultdict(list)
+        for table, row in batch:
+            by_table[table].append(row)
+        try:
+            async with open_session() as db:
+                for table, rows in by_table.items():
+                    await db.execute(insert(table), rows)
+                await db.commit()
+        except Exception as e:
+            logger.warning("event_buffer_batch_failed", rows=len(batch), error=str(e))
+            await self._flush_rows(batch)
+            return
+        logger.debug("event_buffer_flushed", rows=len(batch), tables=len(by_table))
+
+    async def _flush_rows(self, batch: list) -> None:
+        """Fallback for a failed batch: insert each row under its own savepoint."""
+        written = 0
+        try:
+            async with open_session() as db:
+                for table, row in batch:
+                    try:
+                        async with db.begin_nested():
+                            await db.execute(insert(table), [row])
+                        written += 1
+                    except Exception as e:
+                        logger.error("event_buffer_row_dropped", table=table.name, error=str(e))
+                if written:
+                    await db.commit()
+        except Exception as e:
+            logger.error("event_buffer_flush_failed", rows=len(batch), error=str(e))
+            return
+        logger.debug("event_buffer_flushed_rows", rows=written, dropped=len(batch) - written)
+
+
+event_buffer = EventBuffer()
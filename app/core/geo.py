@@ -0,0 +1,83 @@
+"""
+IP → geo lookup (MaxMind GeoLite2).
+
+Optional: install geoip2 and point SF_GEOIP_PATH at GeoLite2-City.mmdb
+(SF_GEOIP_ASN_PATH at GeoLite2-ASN.mmdb for asn/isp). Without them every
+lookup returns empty fields.
+
+Results are cached per IPv4 /24 (full address for IPv6) as plain tuples —
+neighbouring addresses share a record, and a hit skips both the mmdb tree
+walk and building geoip2's response objects.
+"""
+
+import ipaddress
+from functools import lru_cache
+
+from app.config import get_settings
+
+import structlog
+
+logger = structlog.get_logger()
+
+_FIELDS = ("country_code", "region", "city", "asn", "isp")
+_EMPTY = (None, None, None, None, None)
+
+_readers = None
+
+
+def _get_readers():
+    """(city_reader, asn_reader, not_found_error) — opened once, memory-mapped."""
+    global _readers
+    if _readers is None:
+        settings = get_settings()
+        city = asn = None
+        not_found = LookupError
+        if settings.geoip_path or settings.geoip_asn_path:
+            try:
+                import geoip2.database
+                import geoip2.errors
+            except ImportError:
+                logger.warning("geoip2_not_installed")
+            else:
+                not_found = geoip2.errors.AddressNotFoundError
+                if settings.geoip_path:
+                    city = geoip2.database.Reader(settings.geoip_path)
+                if settings.geoip_asn_path:
+                    asn = geoip2.database.Reader(settings.geoip_asn_path)
+        _readers = (city, asn, not_found)
+    return _readers
+
+
+@lru_cache(maxsize=10_000)
+def _lookup_cached(addr: ipaddress.IPv4Address | ipaddress.IPv6Address) -> tuple:
+    city_reader, asn_reader, not_found = _get_readers()
+    country_code = region = city = asn = isp = None
+    if city_reader is not None:
+        try:
+            rec = city_reader.city(addr)
+            country_code = rec.country.iso_code
+            region = rec.subdivisions.most_specific.iso_code
+            city = rec.city.name
+        except not_found:
+            pass
+    if asn_reader is not None:
+        try:
+            rec = asn_reader.asn(addr)
+            asn = rec.autonomous_system_number
+            isp = rec.autonomous_system_organization
+        except not_found:
+            pass
+    return (country_code, region, city, asn, isp)
+
+
+def geo_lookup(ip: str, addr: ipaddress.IPv4Address | ipaddress.IPv6Address | None = None) -> dict:
+    """Geo fields for `ip`. Pass `addr` if the caller has already parsed it."""
+    if addr is None:
+        try:
+            addr = ipaddress.ip_address(ip)
+        except ValueError:
+            return dict(zip(_FIELDS, _EMPTY))
+    if addr.version == 4:
+        # Cache key is the /24 network address
+        addr = ipaddress.IPv4Address(int(addr) & 0xFFFFFF00)
+    return dict(zip(_FIELDS, _lookup_cached(addr)))
@@ -0,0 +1,101 @@
+"""
+Redis cache for the redirect's link lookup.
+
+Click traffic is heavily skewed toward a few hot campaigns, so the link row
+the redirect needs is cached in Redis for LINK_TTL seconds, keyed by route.
+Values are msgpack arrays (CachedLink is array_like) — compact, and decoded
+straight into a struct with attribute access like the DB row.
+
+Only active links are cached. Anything that changes a link's status or
+destination must call invalidate(); the TTL bounds staleness otherwise.
+Redis errors are treated as misses, and trip a short circuit breaker: for
+REDIS_BACKOFF seconds get/put skip Redis entirely, so an outage costs one
+socket timeout per worker rather than one per click.
+"""
+
+import time
+from uuid import UUID
+
+import msgspec
+import structlog
+from redis.exceptions import RedisError
+
+from app.core.redis_client import get_redis
+
+logger = structlog.get_logger()
+
+LINK_TTL = 60  # seconds
+REDIS_BACKOFF = 5.0  # seconds to bypass Redis after an error
+
+# time.monotonic() until which get/put don't touch Redis
+_skip_until = 0.0
+
+
+def _trip(error: Exception) -> None:
+    global _skip_until
+    _skip_until = time.monotonic() + REDIS_BACKOFF
+    logger.warning("link_cache_unavailable", error=str(error), backoff_s=REDIS_BACKOFF)
+
+
+class CachedLink(msgspec.Struct, array_like=True):
+    """Same fields as redirect._LINK_COLUMNS."""
+    id: UUID
+    organization_id: UUID
+    creator_id: UUID
+    campaign_id: UUID
+    creator_handle: str
+    campaign_slug: str
+    asset_slug: str | None
+    destination_url: str
+    param_overrides: dict | None
+    ios_deeplink: str | None
+    ios_fallback_url: str | None
+    android_deeplink: str | None
+    android_fallback_url: str | None
+    universal_link: str | None
+
+
+_encoder = msgspec.msgpack.Encoder()
+_decoder = msgspec.msgpack.Decoder(CachedLink)
+
+
+def _key(creator_handle: str, campaign_slug: str, asset_slug: str | None) -> str:
+    return f"link:{creator_handle}/{campaign_slug}/{asset_slug or ''}"
+
+
+async def get(creator_handle: str, campaign_slug: str, asset_slug: str | None) -> CachedLink | None:
+    if time.monotonic() < _skip_until:
+        return None
+    try:
+        raw = await get_redis().get(_key(creator_handle, campaign_slug, asset_slug))
+    except (RedisError, OSError) as e:
+        _trip(e)
+        return None
+    if raw is None:
+        return None
+    try:
+        return _decoder.decode(raw)
+    except msgspec.DecodeError:
+        return None
+
+
+async def put(row) -> None:
+    """Cache a link row (anything with CachedLink's attributes)."""
+    if time.monotonic() < _skip_until:
+        return
+    link = CachedLink(**{f: getattr(row, f) for f in CachedLink.__struct_fields__})
+    try:
+        await get_redis().set(
+            _key(link.creator_handle, link.campaign_slug, link.asset_slug),
+            _encoder.encode(link),
+            ex=LINK_TTL,
+        )
+    except (RedisError, OSError) as e:
+        _trip(e)
+
+
+async def invalidate(creator_handle: str, campaign_slug: str, asset_slug: str | None) -> None:
+    try:
+        await get_redis().delete(_key(creator_handle, campaign_slug, asset_slug))
+    except (RedisError, OSError) as e:
+        logger.warning("link_cache_invalidate_failed", error=str(e))
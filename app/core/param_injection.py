@@ -18,7 +18,9 @@ What the PLATFORMS author (we just passthrough):
   - fbclid, ttclid, ScCid, gclid, wbraid, gbraid, msclkid, epik, li_fat_id, twclid, rdt_cid
 """
 
-from urllib.parse import urlencode, urlparse, parse_qs, urlunparse
+from collections.abc import Mapping
+from functools import lru_cache
+from urllib.parse import quote_plus, unquote_plus, urlparse
 
 
 # Maps source_platform → utm_source value
@@ -71,6 +73,8 @@ def extract_platform_params(query_params: dict) -> dict:
     return captured
 
 
+# Pure in dest_url, and a campaign has only a handful of destinations
+@lru_cache(maxsize=4096)
 def _sanitize_campaign(dest_url: str) -> str:
     """
     Build utm_campaign from destination URL "after host".
@@ -118,7 +122,7 @@ def _sanitize_campaign(dest_url: str) -> str:
 
 
 def _encode_referrer(referrer: str | None) -> str:
-    """Return the raw referrer string for utm_content (encoding handled by urlencode later)."""
+    """Return the raw referrer string for utm_content (encoding handled by inject_params_to_url)."""
     if not referrer:
         return ""
     # Cap at 500 chars to avoid URL length issues
@@ -136,7 +140,7 @@ def build_tracking_params(
     param_overrides: dict | None = None,
     has_app_destination: bool = False,
     platform_params: dict | None = None,
-    request_headers: dict | None = None,
+    request_headers: Mapping[str, str] | None = None,
 ) -> dict:
     params = {}
 
@@ -214,6 +218,12 @@ def build_tracking_params(
     return params
 
 
+def _query_key(pair: str) -> str:
+    """Decoded key of one raw `k=v` query pair."""
+    key = pair.partition("=")[0]
+    return unquote_plus(key) if "%" in key or "+" in key else key
+
+
 def inject_params_to_url(url: str, params: dict, policy: str = "only_if_missing") -> str:
     """
     Append tracking parameters to a URL.
@@ -221,17 +231,43 @@ def inject_params_to_url(url: str, params: dict, policy: str = "only_if_missing"
     policy:
       "only_if_missing" — don't overwrite existing UTMs (recommended)
       "always_override" — our params win
+
+    Works on the raw string: split off the fragment and query, read just the
+    existing keys, append encoded pairs. The merchant's own query is kept
+    byte-for-byte rather than parsed and re-encoded.
     """
-    parsed = urlparse(url)
-    existing = parse_qs(parsed.query, keep_blank_values=True)
+    url, hash_sign, fragment = url.partition("#")
+    base, _, query = url.partition("?")
+    pairs = [p for p in query.split("&") if p] if query else []
+
+    if policy == "only_if_missing":
+        present = {_query_key(p) for p in pairs}
+        added = [(k, v) for k, v in params.items() if k not in present]
+    else:
+        pairs = [p for p in pairs if _query_key(p) not in params]
+        added = params.items()
 
-    for key, value in params.items():
-        if policy == "only_if_missing" and key in existing:
-            continue
-        existing[key] = [str(value)]
+    pairs.extend(f"{quote_plus(str(k))}={quote_plus(str(v))}" for k, v in added)
+    query = "?" + "&".join(pairs) if pairs else ""
+    return f"{base}{query}{hash_sign}{fragment}"
 
-    new_query = urlencode(existing, doseq=True)
-    return urlunparse(parsed._replace(query=new_query))
+
+def _append_click_id_to_url(url: str, click_id: str) -> str:
+    """Fast path for the common case of inject_params_to_url({"inf_click_id": ...}).
+
+    Splices the one parameter onto the string instead of parsing and
+    re-encoding the whole query. Fragments and URLs that already carry
+    inf_click_id take the full path.
+    """
+    if "#" in url or "inf_click_id=" in url:
+        return inject_params_to_url(url, {"inf_click_id": click_id}, policy="only_if_missing")
+    if "?" not in url:
+        sep = "?"
+    elif url[-1] in "?&":
+        sep = ""
+    else:
+        sep = "&"
+    return f"{url}{sep}inf_click_id={quote_plus(click_id)}"
 
 
 def resolve_destination(
@@ -244,7 +280,7 @@ def resolve_destination(
     os_family: str | None,
     platform_params: dict | None = None,
     referrer: str | None = None,
-    request_headers: dict | None = None,
+    request_headers: Mapping[str, str] | None = None,
 ) -> tuple[str, dict]:
     """Determine final destination URL. Returns (final_url, injected_params)."""
     has_app_destination = bool(
@@ -311,5 +347,10 @@ def resolve_destination(
                 url_params["android_deeplink"] = link.android_deeplink + \
                     ("&" if "?" in link.android_deeplink else "?") + f"inf_click_id={click_id}"
 
-    final_url = inject_params_to_url(base_url, url_params, policy="only_if_missing")
+    # An inf_click_id in param_overrides replaces the minted one — pass the
+    # dict's value, not click_id
+    if url_params.keys() == {"inf_click_id"}:
+        final_url = _append_click_id_to_url(base_url, url_params["inf_click_id"])
+    else:
+        final_url = inject_params_to_url(base_url, url_params, policy="only_if_missing")
     return final_url, params
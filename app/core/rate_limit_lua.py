@@ -0,0 +1,57 @@
+"""
+Redis sliding-window rate limiter.
+
+One sorted set per key, scored by hit time in ms. A single Lua script trims
+expired hits, counts, and records the new hit atomically — one round-trip,
+shared across all workers.
+
+The script returns the hit count including the attempted hit; anything
+above the limit means the hit was rejected (and not recorded).
+
+If Redis is unreachable, callers get None and should fall back to their
+process-local limiter.
+"""
+
+import time
+import uuid
+from typing import Optional
+
+import structlog
+from redis.exceptions import RedisError
+
+from app.core.redis_client import get_redis
+
+logger = structlog.get_logger()
+
+# KEYS[1] = key, ARGV = now_ms, window_s, limit, member
+SLIDING_WINDOW_LUA = """
+redis.call('ZREMRANGEBYSCORE', KEYS[1], 0, ARGV[1] - ARGV[2] * 1000)
+local c = redis.call('ZCARD', KEYS[1])
+if c >= tonumber(ARGV[3]) then return c + 1 end
+redis.call('ZADD', KEYS[1], ARGV[1], ARGV[1] .. ':' .. ARGV[4])
+redis.call('PEXPIRE', KEYS[1], ARGV[2] * 1000)
+return c + 1
+"""
+
+_script = None
+
+
+def _get_script():
+    """Lazy registered script (EVALSHA on the cached SHA, SCRIPT LOAD on NOSCRIPT)."""
+    global _script
+    if _script is None:
+        _script = get_redis().register_script(SLIDING_WINDOW_LUA)
+    return _script
+
+
+async def sliding_window_hit(key: str, limit: int, window_seconds: int) -> Optional[int]:
+    """Record a hit for `key`. Returns the count including this hit, or None if Redis is down."""
+    now_ms = int(time.time() * 1000)
+    try:
+        return int(await _get_script()(
+            keys=[key],
+            args=[now_ms, window_seconds, limit, uuid.uuid4().hex[:8]],
+        ))
+    except (RedisError, OSError) as e:
+        logger.warning("redis_rate_limit_unavailable", key=key, error=str(e))
+        return None
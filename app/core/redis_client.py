@@ -0,0 +1,22 @@
+"""
+Shared Redis client.
+
+One lazily-created connection pool per process, shared by the rate
+limiter and caches. Short socket timeout: every caller treats Redis as
+best-effort and falls back when it's slow or down.
+"""
+
+from typing import Optional
+
+from redis import asyncio as aioredis
+
+from app.config import get_settings
+
+_redis: Optional[aioredis.Redis] = None
+
+
+def get_redis() -> aioredis.Redis:
+    global _redis
+    if _redis is None:
+        _redis = aioredis.from_url(get_settings().redis_url, socket_timeout=0.25)
+    return _redis
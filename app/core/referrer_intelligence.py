@@ -19,9 +19,40 @@ Classifies:
 """
 
 import re
+from collections.abc import Mapping
 from dataclasses import dataclass, field
+from functools import lru_cache
 from urllib.parse import urlparse
 
+from app.core.user_agent import parse_user_agent
+
+
+# --- Dimension codes ---
+# Smallint codes for the low-cardinality text columns on click_events, seeded
+# into the *_dim tables by migration click_dimension_codes_015. Append only —
+# a code, once shipped, names the same value forever. Open-ended values (raw
+# utm_source / utm_medium) have no code and keep only their text column.
+
+SOURCE_PLATFORMS = (
+    "direct", "unknown", "unknown_external", "same_site", "same_origin",
+    "instagram", "tiktok", "youtube", "twitter", "facebook", "threads",
+    "snapchat", "linkedin", "pinterest", "reddit", "tumblr",
+    "telegram", "whatsapp", "discord", "wechat", "line", "sms",
+    "google", "bing", "yahoo", "duckduckgo", "baidu", "yandex",
+    "gmail", "outlook", "yahoo_mail", "aol_mail", "apple_mail", "protonmail",
+    "mailspring", "thunderbird", "email", "newsletter", "mailchimp",
+    "sendgrid", "klaviyo",
+    "linktree", "beacons", "stan_store", "hoobe", "snipfeed", "tapbio",
+    "campsite", "bitly", "tinyurl", "branch", "substack", "medium",
+    "hackernews", "producthunt",
+)
+SOURCE_MEDIUMS = ("direct", "social", "search", "email", "messaging", "paid", "referral", "internal")
+DEVICE_CLASSES = ("unknown", "mobile", "tablet", "desktop", "other")
+
+_SOURCE_PLATFORM_IDS = {name: i for i, name in enumerate(SOURCE_PLATFORMS, 1)}
+_SOURCE_MEDIUM_IDS = {name: i for i, name in enumerate(SOURCE_MEDIUMS, 1)}
+_DEVICE_CLASS_IDS = {name: i for i, name in enumerate(DEVICE_CLASSES, 1)}
+
 
 @dataclass
 class ClickIntelligence:
@@ -53,6 +84,18 @@ class ClickIntelligence:
     referer_path: str | None = None
     referer_full: str | None = None
 
+    @property
+    def source_platform_id(self) -> int | None:
+        return _SOURCE_PLATFORM_IDS.get(self.source_platform)
+
+    @property
+    def source_medium_id(self) -> int | None:
+        return _SOURCE_MEDIUM_IDS.get(self.source_medium)
+
+    @property
+    def device_class_id(self) -> int | None:
+        return _DEVICE_CLASS_IDS.get(self.device_class)
+
 
 # --- In-App Browser Detection ---
 
@@ -184,7 +227,7 @@ def _detect_utm_source(query_params: dict) -> tuple[str | None, str | None, str
 
 # --- sec-fetch-site Classification ---
 
-def _classify_sec_fetch(headers: dict | None) -> tuple[str | None, str | None]:
+def _classify_sec_fetch(headers: Mapping[str, str] | None) -> tuple[str | None, str | None]:
     """
     Use sec-fetch-site to determine if click was external.
     Returns (platform_hint, medium_hint) or (None, None).
@@ -427,20 +470,15 @@ def _parse_accept_language(header: str | None) -> tuple[str | None, str | None]:
         return None, None
 
 
-def _parse_device_from_ua(ua_string: str | None) -> dict:
-    """Enhanced device parsing with version info."""
-    if not ua_string:
-        return {
-            "device_class": "unknown",
-            "os_family": "unknown",
-            "os_version": None,
-            "browser_family": "unknown",
-            "browser_version": None,
-            "is_mobile": False,
-        }
-
-    from user_agents import parse as parse_ua
-    parsed = parse_ua(ua_string)
+_DEVICE_FIELDS = ("device_class", "os_family", "os_version", "browser_family", "browser_version", "is_mobile")
+_UNKNOWN_DEVICE = ("unknown", "unknown", None, "unknown", None, False)
+
+
+@lru_cache(maxsize=4096)
+def _parse_device_cached(ua_string: str) -> tuple:
+    """user_agents' regex cascade is the expensive part of a click, and UA
+    strings repeat heavily — memoize the result as an immutable tuple."""
+    parsed = parse_user_agent(ua_string)
 
     if parsed.is_mobile:
         device = "mobile"
@@ -451,14 +489,21 @@ def _parse_device_from_ua(ua_string: str | None) -> dict:
     else:
         device = "other"
 
-    return {
-        "device_class": device,
-        "os_family": parsed.os.family,
-        "os_version": ".".join(str(v) for v in parsed.os.version if v is not None) or None,
-        "browser_family": parsed.browser.family,
-        "browser_version": ".".join(str(v) for v in parsed.browser.version if v is not None) or None,
-        "is_mobile": parsed.is_mobile or parsed.is_tablet,
-    }
+    return (
+        device,
+        parsed.os.family,
+        ".".join(str(v) for v in parsed.os.version if v is not None) or None,
+        parsed.browser.family,
+        ".".join(str(v) for v in parsed.browser.version if v is not None) or None,
+        parsed.is_mobile or parsed.is_tablet,
+    )
+
+
+def _parse_device_from_ua(ua_string: str | None) -> dict:
+    """Enhanced device parsing with version info."""
+    if not ua_string:
+        return dict(zip(_DEVICE_FIELDS, _UNKNOWN_DEVICE))
+    return dict(zip(_DEVICE_FIELDS, _parse_device_cached(ua_string)))
 
 
 # --- Main Entry Point ---
@@ -467,7 +512,7 @@ def analyze_click(
     user_agent: str | None,
     referer: str | None,
     accept_language: str | None,
-    headers: dict | None = None,
+    headers: Mapping[str, str] | None = None,
     query_params: dict | None = None,
 ) -> ClickIntelligence:
     """
@@ -0,0 +1,32 @@
+"""
+Destination URL validation — shared by every link-creation path.
+
+Prevents open-redirect abuse and SSRF-style wrapping of internal hosts:
+  - scheme must be http or https
+  - host must not be localhost / loopback / link-local / private ranges
+"""
+
+import re
+from urllib.parse import urlsplit
+
+from fastapi import HTTPException
+
+_BLOCKED_HOST_RE = re.compile(
+    r"^(?:localhost|127\.|0\.0\.0\.0|169\.254\.|10\.|192\.168\.|172\.16\.|::1$)",
+    re.IGNORECASE,
+)
+
+
+def validate_destination_url(url: str) -> None:
+    """Raise 400 unless `url` is an http(s) URL pointing at a public host."""
+    try:
+        parts = urlsplit(url)
+        host = parts.hostname
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid destination_url")
+    if parts.scheme not in ("http", "https"):
+        raise HTTPException(status_code=400, detail="destination_url must start with https:// or http://")
+    if not host:
+        raise HTTPException(status_code=400, detail="Invalid destination_url")
+    if _BLOCKED_HOST_RE.match(host):
+        raise HTTPException(status_code=400, detail="destination_url cannot point to internal addresses")
@@ -0,0 +1,17 @@
+"""
+Shared user-agent parsing.
+
+user_agents.parse runs a long regex cascade, and a click needs it twice —
+bot scoring and device classification. Both sit behind their own result
+caches and parse through this one, so a new UA is parsed once, not twice.
+"""
+
+from functools import lru_cache
+
+from user_agents import parse
+from user_agents.parsers import UserAgent
+
+
+@lru_cache(maxsize=1024)
+def parse_user_agent(ua_string: str) -> UserAgent:
+    return parse(ua_string)
@@ -3,11 +3,15 @@ Stackfluence — influencer measurement infrastructure.
 Main application entry point.
 """
 
-from contextlib import asynccontextmanager
+import asyncio
+import ssl
+from contextlib import asynccontextmanager, suppress
 from pathlib import Path
 
+import orjson
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from fastapi.staticfiles import StaticFiles
 
 from app.api.redirect import router as redirect_router
@@ -17,29 +21,72 @@ from app.api.links import router as links_router
 from app.api.quick_link import router as quick_link_router
 from app.api.admin import router as admin_router
 from app.api.dashboard import router as dashboard_router
-from app.api.demo import router as demo_router
-from app.api.pixel import router as pixel_router
+from app.api.demo import router as demo_router, demo_ratelimit_janitor
+from app.api.pixel import router as pixel_router, pixel_heartbeat_log_drainer
 from app.api.pixel_settings import router as pixel_settings_router
 from app.api.connections import router as connections_router
 from app.config import get_settings
+from app.core.event_buffer import event_buffer
+from app.models.database import warm_pool
 
 import structlog
 
-structlog.configure(
-    processors=[
-        structlog.processors.TimeStamper(fmt="iso"),
-        structlog.processors.add_log_level,
-        structlog.dev.ConsoleRenderer() if get_settings().debug else structlog.processors.JSONRenderer(),
-    ],
-)
+if get_settings().debug:
+    structlog.configure(
+        processors=[
+            structlog.processors.TimeStamper(fmt="iso"),
+            structlog.processors.add_log_level,
+            structlog.dev.ConsoleRenderer(),
+        ],
+    )
+else:
+    # orjson renders straight to bytes; the bytes logger writes them as-is
+    structlog.configure(
+        processors=[
+            structlog.processors.TimeStamper(fmt="iso"),
+            structlog.processors.add_log_level,
+            structlog.processors.JSONRenderer(serializer=orjson.dumps),
+        ],
+        logger_factory=structlog.BytesLoggerFactory(),
+        cache_logger_on_first_use=True,
+    )
 
 logger = structlog.get_logger()
 
 
+def _cpu_has_sha_ni() -> bool | None:
+    """Whether the CPU advertises SHA extensions — OpenSSL uses them for the
+    click-id and webhook HMACs. None where /proc/cpuinfo isn't available."""
+    try:
+        with open("/proc/cpuinfo") as f:
+            for line in f:
+                if line.startswith("flags"):
+                    return "sha_ni" in line.split()
+    except OSError:
+        pass
+    return None
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    logger.info("stackfluence_starting", base_url=get_settings().base_url)
+    logger.info(
+        "stackfluence_starting",
+        base_url=get_settings().base_url,
+        openssl=ssl.OPENSSL_VERSION,
+        sha_ni=_cpu_has_sha_ni(),
+    )
+    background = [
+        asyncio.create_task(demo_ratelimit_janitor()),
+        asyncio.create_task(pixel_heartbeat_log_drainer()),
+    ]
+    await warm_pool()
+    event_buffer.start()
     yield
+    for task in background:
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+    await event_buffer.stop()
     logger.info("stackfluence_shutting_down")
 
 
@@ -48,6 +95,7 @@ app = FastAPI(
     description="Influencer measurement infrastructure — from click to conversion, cleanly.",
     version="0.2.0",
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
     docs_url="/docs" if get_settings().debug else None,
     redoc_url="/redoc" if get_settings().debug else None,
     openapi_url="/openapi.json" if get_settings().debug else None,
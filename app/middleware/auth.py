@@ -3,6 +3,7 @@ import secrets
 import time
 from dataclasses import dataclass
 from enum import Enum
+from functools import cached_property
 from uuid import UUID
 
 from fastapi import Depends, HTTPException, Request, Security
@@ -55,6 +56,15 @@ class AuthContext:
     key_type: str
     key_id: UUID
 
+    # Hex-formatted once per request, then reused by rate limiting and logging
+    @cached_property
+    def key_id_str(self) -> str:
+        return str(self.key_id)
+
+    @cached_property
+    def organization_id_str(self) -> str:
+        return str(self.organization_id)
+
 
 async def _resolve_key(raw_key: str | None, db: AsyncSession) -> AuthContext:
     if not raw_key:
@@ -11,7 +11,9 @@ Dedupe:
 """
 
 import hashlib
+import ipaddress
 import time
+from cachetools import TTLCache
 from fastapi import HTTPException, Request
 from app.config import get_settings
 
@@ -22,6 +24,10 @@ logger = structlog.get_logger()
 _memory_store: dict[str, list[float]] = {}
 _dedupe_store: dict[str, float] = {}
 
+# key → epoch when its window next frees a slot. A key that is already over
+# quota is rejected from here without rescanning its timestamp list.
+_blocked_until: TTLCache = TTLCache(maxsize=100_000, ttl=60)
+
 
 def _sliding_window_check(key: str, limit: int, window_seconds: int = 60) -> tuple[bool, int]:
     now = time.time()
@@ -34,6 +40,7 @@ def _sliding_window_check(key: str, limit: int, window_seconds: int = 60) -> tup
     current_count = len(_memory_store[key])
 
     if current_count >= limit:
+        _blocked_until[key] = _memory_store[key][0] + window_seconds
         return False, 0
 
     _memory_store[key].append(now)
@@ -41,7 +48,11 @@ def _sliding_window_check(key: str, limit: int, window_seconds: int = 60) -> tup
 
 
 def check_rate_limit(key: str, limit: int, window: int = 60):
-    allowed, remaining = _sliding_window_check(key, limit, window)
+    reset_at = _blocked_until.get(key)
+    if reset_at is not None and time.time() < reset_at:
+        allowed, remaining = False, 0
+    else:
+        allowed, remaining = _sliding_window_check(key, limit, window)
     if not allowed:
         raise HTTPException(
             status_code=429,
@@ -81,32 +92,79 @@ def check_dedupe(ip: str, slug: str, ua: str, window_seconds: int = 3) -> bool:
     return False
 
 
-def _get_real_ip(request: Request) -> str:
-    """Extract real client IP from x-forwarded-for or request."""
+_PRIVATE_NETS = tuple(ipaddress.ip_network(n) for n in (
+    "10.0.0.0/8", "172.16.0.0/12", "192.168.0.0/16", "127.0.0.0/8",
+    "::1/128", "fc00::/7",
+))
+
+
+def forwarded_client_ip(
+    forwarded: str, rightmost: bool = False,
+) -> tuple[str, ipaddress.IPv4Address | ipaddress.IPv6Address] | None:
+    """Client (ip, parsed address) from an X-Forwarded-For value, or None.
+
+    The first public hop, scanning from the left — or from the right with
+    rightmost=True, where hops left of the last proxy are client-supplied.
+    Failing that, the leftmost hop that is an address at all. Hops that don't
+    parse (or are longer than any address, i.e. the ip_address column) are
+    never returned.
+    """
+    hops = []
+    for hop in forwarded.split(","):
+        hop = hop.strip()
+        if len(hop) > 45:
+            continue
+        try:
+            hops.append((hop, ipaddress.ip_address(hop)))
+        except ValueError:
+            continue
+    if not hops:
+        return None
+    for hop, addr in (reversed(hops) if rightmost else hops):
+        if not any(addr in net for net in _PRIVATE_NETS):
+            return hop, addr
+    return hops[0]
+
+
+def get_client_ip(request: Request) -> str:
+    """Extract real client IP from x-forwarded-for or request.
+
+    Resolved once per request and kept on request.state (along with the
+    parsed address as `client_ip_addr`, None if unparseable) so rate
+    limiting, bot logging and geo lookup share the work.
+    """
+    cached = getattr(request.state, "client_ip", None)
+    if cached is not None:
+        return cached
+
     forwarded = request.headers.get("x-forwarded-for")
-    if forwarded:
-        ips = [ip.strip() for ip in forwarded.split(",")]
-        for ip in ips:
-            if not ip.startswith(("10.", "172.16.", "172.17.", "172.18.", "172.19.",
-                                  "172.20.", "172.21.", "172.22.", "172.23.", "172.24.",
-                                  "172.25.", "172.26.", "172.27.", "172.28.", "172.29.",
-                                  "172.30.", "172.31.", "192.168.", "127.", "::1")):
-                return ip
-        return ips[0]
-    return request.client.host if request.client else "unknown"
+    found = forwarded_client_ip(forwarded) if forwarded else None
+    if found is not None:
+        ip, addr = found
+    else:
+        ip = request.client.host if request.client else "unknown"
+        try:
+            addr = ipaddress.ip_address(ip)
+        except ValueError:
+            addr = None
+    request.state.client_ip = ip
+    request.state.client_ip_addr = addr
+    return ip
+
+
+_IP_LIMIT_PER_MINUTE: int = get_settings().rate_limit_per_ip_per_minute
 
 
 def rate_limit_ip(request: Request, limit: int | None = None):
-    settings = get_settings()
-    ip = _get_real_ip(request)
+    ip = get_client_ip(request)
     return check_rate_limit(
         f"ip:{ip}",
-        limit or settings.rate_limit_per_ip_per_minute,
+        limit or _IP_LIMIT_PER_MINUTE,
     )
 
 
 def rate_limit_link(request: Request, creator: str, campaign: str):
-    ip = _get_real_ip(request)
+    ip = get_client_ip(request)
     return check_rate_limit(
         f"link:{ip}:{creator}:{campaign}",
         10,
@@ -1,8 +1,16 @@
 """Async database engine and session management."""
 
+import asyncio
+
+import orjson
+import structlog
+from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
 from app.config import get_settings
 
+logger = structlog.get_logger()
+
 # Lazy initialization — engine created on first use, not at import time.
 # This prevents alembic (which runs synchronously) from crashing when
 # other modules import from here at the module level.
@@ -10,20 +18,86 @@ _engine = None
 _async_session = None
 
 
+def _json_dumps(value) -> str:
+    """JSON/JSONB bind encoder — orjson instead of the stdlib json default.
+    Non-str dict keys are stringified, as json.dumps would."""
+    return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS).decode()
+
+
 def _get_engine():
     global _engine
     if _engine is None:
         settings = get_settings()
+        if settings.db_pgbouncer:
+            # PgBouncer owns the pool; transaction pooling can't keep
+            # asyncpg's per-connection prepared statements.
+            pool_args = {
+                "poolclass": NullPool,
+                "connect_args": {"statement_cache_size": 0, "prepared_statement_cache_size": 0},
+            }
+        else:
+            pool_args = {
+                "pool_size": settings.db_pool_size,
+                "max_overflow": settings.db_max_overflow,
+                "pool_timeout": settings.db_pool_timeout,
+                "pool_recycle": settings.db_pool_recycle,
+                "pool_pre_ping": settings.db_pool_pre_ping,
+            }
         _engine = create_async_engine(
             settings.database_url,
-            pool_size=20,
-            max_overflow=10,
-            pool_pre_ping=True,
             echo=settings.debug,
+            json_serializer=_json_dumps,
+            json_deserializer=orjson.loads,
+            **pool_args,
         )
     return _engine
 
 
+def pool_status() -> dict | None:
+    """Connection pool counters for sizing, or None before first use / under PgBouncer."""
+    if _engine is None or isinstance(_engine.pool, NullPool):
+        return None
+    pool = _engine.pool
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+        "idle": pool.checkedin(),
+    }
+
+
+async def warm_pool(timeout: float = 5.0) -> None:
+    """Open every pool slot up front so the first clicks after a deploy
+    don't each pay a connect + auth handshake. Best effort — a database
+    that isn't reachable yet just leaves the pool cold."""
+    settings = get_settings()
+    if settings.db_pgbouncer or not settings.db_pool_warm:
+        return
+    engine = _get_engine()
+
+    async def _touch(conn):
+        await conn.execute(text("SELECT 1"))
+
+    # Hold all connections at once, otherwise the pool hands the same one back
+    results = await asyncio.gather(
+        *(asyncio.wait_for(engine.connect(), timeout) for _ in range(settings.db_pool_size)),
+        return_exceptions=True,
+    )
+    conns = [r for r in results if not isinstance(r, BaseException)]
+    errors = [r for r in results if isinstance(r, BaseException)]
+    try:
+        await asyncio.gather(*(_touch(c) for c in conns))
+    except Exception as e:
+        errors.append(e)
+    finally:
+        for conn in conns:
+            await conn.close()
+    if errors:
+        logger.warning("db_pool_warm_failed", failed=len(errors), error=str(errors[0]))
+        return
+    logger.info("db_pool_warmed", **(pool_status() or {}))
+
+
 def _get_session_maker():
     global _async_session
     if _async_session is None:
@@ -35,8 +109,24 @@ def _get_session_maker():
     return _async_session
 
 
+def open_session() -> AsyncSession:
+    """New session outside the request scope (background tasks). Use as `async with`."""
+    return _get_session_maker()()
+
+
 async def get_db() -> AsyncSession:
     """FastAPI dependency — yields an async session."""
     session_maker = _get_session_maker()
     async with session_maker() as session:
         yield session
+
+
+async def commit_without_fsync(session: AsyncSession) -> None:
+    """Commit without waiting for the WAL flush to disk.
+
+    The transaction is still atomic and visible immediately; a server crash
+    within a few hundred ms could lose it. Fine for writes the caller can
+    simply retry, not for anything money-related.
+    """
+    await session.execute(text("SET LOCAL synchronous_commit = off"))
+    await session.commit()
@@ -12,7 +12,6 @@ Design:
 
 import datetime
 import secrets
-import string
 from uuid import uuid4
 
 from sqlalchemy import (
@@ -30,10 +29,11 @@ from sqlalchemy.dialects.postgresql import JSONB, UUID
 from app.models.tables import Base
 
 
-def _generate_slug(length: int = 7) -> str:
-    """Generate a short random slug like 'a3xK9mz'."""
-    alphabet = string.ascii_letters + string.digits
-    return "".join(secrets.choice(alphabet) for _ in range(length))
+def _generate_slugs(count: int, length: int = 7) -> list[str]:
+    """Generate `count` short random slugs like 'a3xK9-z' (URL-safe base64
+    alphabet) from a single urandom read, base64-encoded in C."""
+    token = secrets.token_urlsafe((count * length * 3 + 3) // 4)
+    return [token[i * length:(i + 1) * length] for i in range(count)]
 
 
 class DemoLink(Base):
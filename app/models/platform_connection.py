@@ -53,6 +53,9 @@ class PlatformConnection(Base):
         UniqueConstraint("org_id", "platform", "link_id",
                          name="uq_platform_connection_org_platform_link"),
     )
+    # Fetch server-generated created_at/updated_at via INSERT/UPDATE ... RETURNING
+    # instead of a follow-up SELECT
+    __mapper_args__ = {"eager_defaults": True}
 
 
 class TokenRefreshLog(Base):
@@ -20,6 +20,8 @@ from sqlalchemy import (
     ForeignKey,
     Index,
     Integer,
+    LargeBinary,
+    SmallInteger,
     String,
     Text,
     func,
@@ -53,7 +55,7 @@ class Creator(Base):
     __tablename__ = "creators"
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid4)
-    handle = Column(String(100), nullable=False, index=True)
+    handle = Column(String(100), nullable=False, unique=True, index=True)
     display_name = Column(String(255), nullable=True)
     platform = Column(String(50), nullable=True)
     platform_user_id = Column(String(255), nullable=True)
@@ -75,6 +77,10 @@ class Campaign(Base):
     metadata_ = Column("metadata", JSONB, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    __table_args__ = (
+        Index("uq_campaigns_org_slug", "organization_id", "slug", unique=True),
+    )
+
 
 class Link(Base):
     __tablename__ = "links"
@@ -117,6 +123,20 @@ class Link(Base):
             "creator_handle", "campaign_slug", "asset_slug",
             unique=True,
         ),
+        # NULL asset_slugs are distinct under the index above — two-segment
+        # routes get their own partial unique index.
+        Index(
+            "uq_links_route_no_asset",
+            "creator_handle", "campaign_slug",
+            unique=True,
+            postgresql_where=asset_slug.is_(None),
+        ),
+        # Per-org listing, newest first. destination_url stays out of the
+        # INCLUDE list — arbitrarily long URLs would blow the btree row limit.
+        Index(
+            "ix_links_org_created_cover", "organization_id", created_at.desc(), id.desc(),
+            postgresql_include=["creator_handle", "campaign_slug", "asset_slug", "status"],
+        ),
     )
 
 
@@ -133,6 +153,32 @@ class ShopifyStore(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
 
+# ---------------------------------------------------------------------------
+# Dimension tables — smallint codes for low-cardinality click columns
+# (values: app.core.referrer_intelligence SOURCE_PLATFORMS etc.)
+# ---------------------------------------------------------------------------
+
+class SourcePlatformDim(Base):
+    __tablename__ = "source_platform_dim"
+
+    id = Column(SmallInteger, primary_key=True, autoincrement=False)
+    name = Column(Text, nullable=False, unique=True)
+
+
+class SourceMediumDim(Base):
+    __tablename__ = "source_medium_dim"
+
+    id = Column(SmallInteger, primary_key=True, autoincrement=False)
+    name = Column(Text, nullable=False, unique=True)
+
+
+class DeviceClassDim(Base):
+    __tablename__ = "device_class_dim"
+
+    id = Column(SmallInteger, primary_key=True, autoincrement=False)
+    name = Column(Text, nullable=False, unique=True)
+
+
 # ---------------------------------------------------------------------------
 # Event tables (append-only)
 # ---------------------------------------------------------------------------
@@ -173,6 +219,8 @@ class ClickEvent(Base):
     # --- Source intelligence (parsed from referrer + UA) ---
     source_platform = Column(String(50), nullable=True)
     source_medium = Column(String(50), nullable=True)
+    source_platform_id = Column(SmallInteger, ForeignKey("source_platform_dim.id"), nullable=True)
+    source_medium_id = Column(SmallInteger, ForeignKey("source_medium_dim.id"), nullable=True)
     source_detail = Column(String(50), nullable=True)
     is_in_app_browser = Column(Boolean, default=False)
     in_app_platform = Column(String(50), nullable=True)
@@ -194,6 +242,7 @@ class ClickEvent(Base):
 
     # --- Device (parsed from UA) ---
     device_class = Column(String(20), nullable=True)
+    device_class_id = Column(SmallInteger, ForeignKey("device_class_dim.id"), nullable=True)
     os_family = Column(String(50), nullable=True)
     os_version = Column(String(20), nullable=True)
     browser_family = Column(String(50), nullable=True)
@@ -268,6 +317,7 @@ class ClickEvent(Base):
     is_suspected_bot = Column(Boolean, default=False)
     bot_reason = Column(Text, nullable=True)
     bot_signals = Column(JSONB, nullable=True)
+    bot_signals_mask = Column(Integer, nullable=False, server_default="0")  # bits: bot_detection.BOT_SIGNAL_BITS
 
     # --- Timing / latency ---
     server_received_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -282,9 +332,15 @@ class ClickEvent(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     __table_args__ = (
-        Index("ix_click_events_org_created", "organization_id", "created_at"),
         Index("ix_click_events_creator_created", "creator_id", "created_at"),
         Index("ix_click_events_source", "organization_id", "source_platform", "source_medium"),
+        Index(
+            "ix_click_events_org_created_cover", "organization_id", created_at.desc(),
+            postgresql_include=[
+                "source_platform", "device_class", "country_code",
+                "bot_blocked", "creator_id", "ip_address",
+            ],
+        ),
     )
 
 
@@ -296,6 +352,7 @@ class ClickEventLog(Base):
     click_id = Column(String(100), nullable=False, index=True)
     event_type = Column(String(50), nullable=False)          # server_received, client_collected, redirected
     payload = Column(JSONB, nullable=True)
+    payload_packed = Column(LargeBinary, nullable=True)     # see app.core.click_log
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
 
@@ -341,6 +398,15 @@ class ConversionEvent(Base):
 
     __table_args__ = (
         Index("ix_conversion_events_org_type", "organization_id", "event_type"),
+        # Shopify webhook idempotency + refund → original conversion lookup
+        Index(
+            "ix_conversion_events_order_id", "order_id",
+            postgresql_include=["click_id", "organization_id"],
+        ),
+        Index(
+            "ix_conversion_events_org_created_cover", "organization_id", "created_at",
+            postgresql_include=["revenue_cents", "event_type", "click_id"],
+        ),
     )
 
 
@@ -355,6 +421,14 @@ class RefundEvent(Base):
     reason = Column(Text, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    __table_args__ = (
+        Index("ix_refund_events_original_order_id", "original_order_id"),
+        Index(
+            "ix_refund_events_org_created_cover", "organization_id", "created_at",
+            postgresql_include=["refund_amount_cents", "click_id"],
+        ),
+    )
+
 
 # ---------------------------------------------------------------------------
 # Universal event table (v5 pixel — capture everything, classify later)
@@ -1,7 +1,9 @@
 """Tests for bot detection scoring."""
 
+from dataclasses import FrozenInstanceError
+
 import pytest
-from app.core.bot_detection import score_request
+from app.core.bot_detection import decode_bot_signals_mask, score_request
 
 
 REAL_CHROME_UA = (
@@ -33,6 +35,10 @@ class TestHardBlocks:
         assert v.should_block is True
         assert v.risk_score == 1.0
 
+    def test_block_reason_names_matching_pattern(self):
+        v = score_request("Go-http-client/1.1", REAL_HEADERS)
+        assert v.reason == "Blocked UA: Go-http-client"
+
     def test_real_browser_not_blocked(self):
         v = score_request(REAL_CHROME_UA, REAL_HEADERS)
         assert v.should_block is False
@@ -91,3 +97,27 @@ class TestCleanTraffic:
         v = score_request(REAL_CHROME_UA, REAL_HEADERS)
         assert v.risk_score == 0.0
         assert v.should_block is False
+
+
+class TestSignalsMask:
+    def test_mask_roundtrip(self):
+        v = score_request("Googlebot/2.1", {}, rate_limited=True)
+        decoded = decode_bot_signals_mask(v.signals.to_mask(dedupe_hit=True))
+        assert decoded["ua_is_known_bot"] is True
+        assert decoded["missing_accept_language"] is True
+        assert decoded["rate_limited"] is True
+        assert decoded["dedupe_hit"] is True
+        assert decoded["ua_blocked"] is False
+
+    def test_clean_request_mask_is_zero(self):
+        assert score_request(REAL_CHROME_UA, REAL_HEADERS).signals.to_mask() == 0
+
+
+class TestCachedVerdicts:
+    def test_shared_verdict_is_immutable(self):
+        v = score_request("Googlebot/2.1", REAL_HEADERS)
+        assert score_request("Googlebot/2.1", REAL_HEADERS) is v  # cached
+        with pytest.raises(FrozenInstanceError):
+            v.signals.rate_limited = True
+        with pytest.raises(TypeError):
+            v.signals.details["note"] = "x"
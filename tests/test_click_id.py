@@ -59,7 +59,25 @@ def test_malformed_strings_rejected():
     assert verify_click_id("a:b:c:d") is None
 
 
+def test_wrong_shape_rejected_without_signing():
+    cid = mint_click_id()
+    with patch("app.core.click_id._sign") as sign:
+        assert verify_click_id(f"{cid.uid.upper()}:{cid.expiry}:{cid.signature}") is None
+        assert verify_click_id(f"{cid.uid}:{cid.expiry}:{cid.signature}0") is None
+        assert verify_click_id(f"{cid.uid[:-1]}:{cid.expiry}:{cid.signature}") is None
+        assert verify_click_id(f"{cid.uid}:-{cid.expiry}:{cid.signature}") is None
+    sign.assert_not_called()
+
+
 def test_click_id_str_format():
     cid = mint_click_id()
     parts = str(cid).split(":")
     assert len(parts) == 3
+
+
+def test_verified_click_id_is_cached():
+    raw = str(mint_click_id())
+    assert verify_click_id(raw) is not None
+    with patch("app.core.click_id._sign") as sign:
+        assert verify_click_id(raw) is not None
+        sign.assert_not_called()
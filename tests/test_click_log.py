@@ -0,0 +1,38 @@
+"""Tests for packed click log payloads."""
+
+from app.core.click_log import pack_server_received, unpack_payload
+
+
+def test_roundtrip_matches_legacy_shape():
+    packed = pack_server_received(
+        ip="203.0.113.7",
+        ua="Mozilla/5.0",
+        referer="https://l.instagram.com/",
+        platform_params=["fbclid"],
+        source="instagram",
+        risk=0.15,
+        sec_fetch=("cross-site", "navigate", "document", "?1"),
+        session_id="abc123",
+        new_session=True,
+    )
+    assert unpack_payload(packed) == {
+        "ip": "203.0.113.7",
+        "ua": "Mozilla/5.0",
+        "referer": "https://l.instagram.com/",
+        "platform_params": ["fbclid"],
+        "source": "instagram",
+        "risk": 0.15,
+        "sec_fetch": {"site": "cross-site", "mode": "navigate", "dest": "document", "user": "?1"},
+        "session_id": "abc123",
+        "new_session": True,
+    }
+
+
+def test_unknown_sec_fetch_values_kept_verbatim():
+    packed = pack_server_received(
+        ip="203.0.113.7", ua=None, referer=None, platform_params=[], source=None, risk=0.0,
+        sec_fetch=("weird", None, "audioworklet", None), session_id="s", new_session=False,
+    )
+    assert unpack_payload(packed)["sec_fetch"] == {
+        "site": "weird", "mode": None, "dest": "audioworklet", "user": None,
+    }
@@ -0,0 +1,68 @@
+"""Tests for the buffered event writer."""
+
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.core.event_buffer import EventBuffer
+from app.models.tables import PageViewEvent, SessionEvent
+
+
+def _mock_session():
+    db = MagicMock()
+    db.execute = AsyncMock()
+    db.commit = AsyncMock()
+    ctx = MagicMock()
+    ctx.__aenter__ = AsyncMock(return_value=db)
+    ctx.__aexit__ = AsyncMock(return_value=False)
+    return db, ctx
+
+
+async def test_batches_rows_per_table_in_one_commit():
+    db, ctx = _mock_session()
+    buf = EventBuffer()
+    with patch("app.core.event_buffer.open_session", return_value=ctx):
+        for i in range(3):
+            await buf.put(SessionEvent, {"click_id": f"c{i}"})
+        await buf.put(PageViewEvent, {"click_id": "c0"})
+        await buf.stop()
+
+    assert db.execute.await_count == 2  # one INSERT per table
+    rows = {call.args[0].table.name: call.args[1] for call in db.execute.await_args_list}
+    assert len(rows["session_events"]) == 3
+    assert len(rows["pageview_events"]) == 1
+    db.commit.assert_awaited_once()
+
+
+async def test_flush_failure_is_swallowed():
+    db, ctx = _mock_session()
+    db.execute.side_effect = RuntimeError("db down")
+    buf = EventBuffer()
+    with patch("app.core.event_buffer.open_session", return_value=ctx):
+        await buf.put(SessionEvent, {"click_id": "c0"})
+        await buf.stop()
+    db.commit.assert_not_awaited()
+
+
+async def test_try_put_many_is_all_or_nothing():
+    with patch("app.core.event_buffer.QUEUE_MAXSIZE", 3):
+        buf = EventBuffer()
+        assert buf.try_put_many([(SessionEvent, {"click_id": "c0"})] * 2)
+        assert not buf.try_put_many([(SessionEvent, {"click_id": "c1"})] * 2)
+    assert buf._get_queue().qsize() == 2
+
+
+async def test_failed_batch_is_retried_per_row():
+    db, ctx = _mock_session()
+
+    async def execute(stmt, rows):
+        if len(rows) > 1 or rows[0]["click_id"] == "bad":
+            raise RuntimeError("value too long")
+
+    db.execute.side_effect = execute
+    buf = EventBuffer()
+    with patch("app.core.event_buffer.open_session", return_value=ctx):
+        for click_id in ("c0", "bad", "c1"):
+            await buf.put(SessionEvent, {"click_id": click_id})
+        await buf._flush(buf._drain_nowait(buf._get_queue(), 10))
+
+    assert db.begin_nested.call_count == 3  # one savepoint per row
+    db.commit.assert_awaited_once()  # the two good rows
@@ -0,0 +1,53 @@
+"""Route-level tests for POST /v1/events/* on the full app's route table."""
+
+from unittest.mock import AsyncMock
+from uuid import uuid4
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.click_id import mint_click_id
+from app.main import app
+from app.middleware.auth import AuthContext, require_auth
+from app.models.database import get_db
+
+ORG_ID = uuid4()
+
+
+@pytest.fixture
+def client():
+    auth = AuthContext(organization_id=ORG_ID, key_type="publishable", key_id=uuid4())
+    app.dependency_overrides[require_auth] = lambda: auth
+    app.dependency_overrides[get_db] = lambda: AsyncMock()
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+def test_identify_is_not_shadowed_by_typed_routes(client):
+    resp = client.post("/v1/events/identify", json={
+        "inf_click_id": str(mint_click_id()), "organization_id": str(ORG_ID),
+    })
+    assert resp.status_code == 201
+    assert resp.json() == {"status": "ok", "event_type": "identify"}
+
+
+def test_custom_is_not_shadowed_by_typed_routes(client):
+    resp = client.post("/v1/events/custom", json={
+        "inf_click_id": str(mint_click_id()), "organization_id": str(ORG_ID), "event_name": "quiz_done",
+    })
+    assert resp.status_code == 201
+    assert resp.json()["event_name"] == "quiz_done"
+
+
+@pytest.mark.parametrize("path, extra", [
+    ("/v1/events/identify", {}),
+    ("/v1/events/custom", {"event_name": "quiz_done"}),
+])
+def test_pixel_events_validate_org(client, path, extra):
+    body = {"inf_click_id": str(mint_click_id()), **extra}
+
+    malformed = client.post(path, json={**body, "organization_id": "not-a-uuid"})
+    assert malformed.status_code == 422
+
+    other_org = client.post(path, json={**body, "organization_id": str(uuid4())})
+    assert other_org.status_code == 403
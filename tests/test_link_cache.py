@@ -0,0 +1,61 @@
+"""Tests for the redirect link cache."""
+
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+from uuid import uuid4
+
+import pytest
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from app.core import link_cache
+
+
+@pytest.fixture(autouse=True)
+def _reset_breaker(monkeypatch):
+    monkeypatch.setattr(link_cache, "_skip_until", 0.0)
+
+
+def _row(**overrides):
+    fields = dict(
+        id=uuid4(), organization_id=uuid4(), creator_id=uuid4(), campaign_id=uuid4(),
+        creator_handle="jane", campaign_slug="spring", asset_slug=None,
+        destination_url="https://shop.example/p", param_overrides={"ref": "jane"},
+        ios_deeplink=None, ios_fallback_url=None,
+        android_deeplink=None, android_fallback_url=None, universal_link=None,
+    )
+    fields.update(overrides)
+    return SimpleNamespace(**fields)
+
+
+async def test_put_then_get_roundtrip():
+    store = {}
+    redis = MagicMock()
+    redis.set = AsyncMock(side_effect=lambda key, value, ex: store.__setitem__(key, value))
+    redis.get = AsyncMock(side_effect=lambda key: store.get(key))
+    row = _row()
+    with patch("app.core.link_cache.get_redis", return_value=redis):
+        await link_cache.put(row)
+        cached = await link_cache.get("jane", "spring", None)
+    assert cached.id == row.id
+    assert cached.destination_url == row.destination_url
+    assert cached.param_overrides == {"ref": "jane"}
+    assert redis.set.await_args.kwargs["ex"] == link_cache.LINK_TTL
+
+
+async def test_redis_error_is_a_miss():
+    redis = MagicMock()
+    redis.get = AsyncMock(side_effect=RedisConnectionError("down"))
+    with patch("app.core.link_cache.get_redis", return_value=redis):
+        assert await link_cache.get("jane", "spring", "reel") is None
+
+
+async def test_redis_error_trips_breaker():
+    redis = MagicMock()
+    redis.get = AsyncMock(side_effect=RedisConnectionError("down"))
+    redis.set = AsyncMock()
+    with patch("app.core.link_cache.get_redis", return_value=redis):
+        assert await link_cache.get("jane", "spring", None) is None
+        assert await link_cache.get("jane", "spring", None) is None
+        await link_cache.put(_row())
+    assert redis.get.await_count == 1  # second lookup skipped Redis
+    redis.set.assert_not_awaited()
@@ -0,0 +1,21 @@
+"""Tests for link listing cursors."""
+
+from datetime import datetime, timezone
+from uuid import uuid4
+
+import pytest
+from fastapi import HTTPException
+
+from app.api.links import _decode_cursor, _encode_cursor
+
+
+def test_cursor_roundtrip():
+    created_at = datetime(2026, 10, 16, 12, 30, 1, 123456, tzinfo=timezone.utc)
+    link_id = uuid4()
+    assert _decode_cursor(_encode_cursor(created_at, link_id)) == (created_at, link_id)
+
+
+def test_malformed_cursor_rejected():
+    with pytest.raises(HTTPException) as exc:
+        _decode_cursor("not-a-cursor")
+    assert exc.value.status_code == 400
@@ -0,0 +1,47 @@
+"""Tests for destination URL param injection."""
+
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.param_injection import _append_click_id_to_url, inject_params_to_url, resolve_destination
+
+CLICK_ID = "0192ab3c:1700000000:abcdef0123456789"
+
+
+@pytest.mark.parametrize("url", [
+    "https://shop.example/p",
+    "https://shop.example/p?a=1",
+    "https://shop.example/p?",
+    "https://shop.example/p?a=1#reviews",
+    "https://shop.example/p?inf_click_id=existing",
+])
+def test_fast_path_matches_full_injection(url):
+    expected = inject_params_to_url(url, {"inf_click_id": CLICK_ID}, policy="only_if_missing")
+    assert _append_click_id_to_url(url, CLICK_ID) == expected
+
+
+def test_existing_query_kept_verbatim_and_missing_params_appended():
+    url = "https://shop.example/p?q=a%20b&utm_source=newsletter#top"
+    out = inject_params_to_url(url, {"utm_source": "instagram", "utm_medium": "social media"})
+    assert out == "https://shop.example/p?q=a%20b&utm_source=newsletter&utm_medium=social+media#top"
+
+
+def test_always_override_replaces_encoded_key():
+    url = "https://shop.example/p?utm%5Fsource=old&x=1"
+    out = inject_params_to_url(url, {"utm_source": "tiktok"}, policy="always_override")
+    assert out == "https://shop.example/p?x=1&utm_source=tiktok"
+
+
+def test_inf_click_id_override_survives_fast_path():
+    link = SimpleNamespace(
+        destination_url="https://shop.example/p", creator_handle="jane", campaign_slug="spring",
+        asset_slug=None, param_overrides={"inf_click_id": "brand-override"},
+        ios_deeplink=None, ios_fallback_url=None, android_deeplink=None,
+        android_fallback_url=None, universal_link=None,
+    )
+    final_url, _ = resolve_destination(
+        link, CLICK_ID, source_platform="instagram", source_medium="social",
+        source_detail=None, is_mobile=False, os_family=None,
+    )
+    assert final_url == "https://shop.example/p?inf_click_id=brand-override"
@@ -0,0 +1,47 @@
+"""Tests for client IP resolution (rate limiting and the demo endpoint)."""
+
+from starlette.requests import Request
+
+from app.api.demo import _get_real_ip
+from app.middleware.rate_limit import forwarded_client_ip, get_client_ip
+
+
+def _request(forwarded: str | None = None) -> Request:
+    headers = [(b"x-forwarded-for", forwarded.encode())] if forwarded else []
+    return Request({"type": "http", "headers": headers, "client": ("10.0.0.5", 1234), "state": {}})
+
+
+def test_skips_private_hops():
+    assert get_client_ip(_request("10.0.0.1, 192.168.1.9, 8.8.8.8")) == "8.8.8.8"
+
+
+def test_172_32_is_public():
+    # Outside 172.16.0.0/12 — the old string-prefix check got this wrong
+    assert get_client_ip(_request("172.32.1.1, 8.8.8.8")) == "172.32.1.1"
+
+
+def test_all_private_falls_back_to_first_hop():
+    assert get_client_ip(_request("192.168.1.1, 10.0.0.2")) == "192.168.1.1"
+
+
+def test_no_forwarded_header_uses_peer():
+    request = _request()
+    assert get_client_ip(request) == "10.0.0.5"
+    assert str(request.state.client_ip_addr) == "10.0.0.5"
+
+
+def test_unparseable_hops_are_never_returned():
+    assert get_client_ip(_request("not-an-ip, 10.0.0.2")) == "10.0.0.2"
+    request = _request("garbage" * 20)
+    assert get_client_ip(request) == "10.0.0.5"
+    assert str(request.state.client_ip_addr) == "10.0.0.5"
+
+
+def test_rightmost_scan_skips_spoofed_left_hops():
+    ip, _ = forwarded_client_ip("1.2.3.4, 8.8.8.8, 10.0.0.1", rightmost=True)
+    assert ip == "8.8.8.8"
+
+
+def test_demo_ip_never_uses_junk_hops():
+    assert _get_real_ip(_request("x" * 60)) == "10.0.0.5"
+    assert _get_real_ip(_request("junk, 192.168.1.1")) == "192.168.1.1"
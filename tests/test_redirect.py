@@ -0,0 +1,42 @@
+"""Tests for the click redirect's prebuilt statements."""
+
+from sqlalchemy.dialects import postgresql
+
+from app.api.redirect import _INSERT_CLICK, _LINK_LOOKUP, _LINK_LOOKUP_NO_ASSET
+
+
+def _sql(stmt) -> str:
+    return str(stmt.compile(dialect=postgresql.dialect()))
+
+
+def test_two_segment_route_matches_partial_unique_index():
+    # Predicate must be literally `asset_slug IS NULL` for the planner to
+    # pick uq_links_route_no_asset
+    sql = _sql(_LINK_LOOKUP_NO_ASSET)
+    assert "links.asset_slug IS NULL" in sql
+    assert "%(asset_slug)s" not in sql
+
+
+def test_three_segment_route_binds_asset_slug():
+    sql = _sql(_LINK_LOOKUP)
+    assert "links.asset_slug = %(asset_slug)s" in sql
+    assert "IS NULL" not in sql
+
+
+def test_click_insert_fills_python_side_defaults():
+    # Core insert still applies Column(default=...) — the id isn't in the row dict
+    sql = str(_INSERT_CLICK.compile(dialect=postgresql.dialect(), column_keys=["click_id"]))
+    assert sql.startswith("INSERT INTO click_events (id, click_id")
+
+
+def test_prebuilt_cookie_matches_set_cookie():
+    from starlette.responses import Response
+
+    from app.api.redirect import _CLICK_COOKIE_SUFFIX, _SECURE_COOKIES
+
+    response = Response()
+    response.set_cookie(
+        "inf_click_id", "abc123", max_age=604800, path="/",
+        samesite="lax", secure=_SECURE_COOKIES, httponly=True,
+    )
+    assert response.headers["set-cookie"] == f"inf_click_id=abc123{_CLICK_COOKIE_SUFFIX}"
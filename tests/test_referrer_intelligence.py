@@ -0,0 +1,42 @@
+"""Tests for click source classification and its dimension codes."""
+
+import importlib.util
+from pathlib import Path
+
+from app.core import referrer_intelligence as ri
+from app.core.referrer_intelligence import ClickIntelligence, analyze_click
+
+MIGRATION = Path(__file__).parent.parent / "alembic" / "versions" / "click_dimension_codes_015.py"
+
+
+def _load_migration():
+    spec = importlib.util.spec_from_file_location("click_dimension_codes_015", MIGRATION)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_dimension_seed_matches_codes():
+    # Codes written by the app must resolve to the rows the migration seeded
+    migration = _load_migration()
+    assert migration.SOURCE_PLATFORMS == ri.SOURCE_PLATFORMS
+    assert migration.SOURCE_MEDIUMS == ri.SOURCE_MEDIUMS
+    assert migration.DEVICE_CLASSES == ri.DEVICE_CLASSES
+
+
+def test_every_mapped_platform_has_a_code():
+    mapped = set(ri.IN_APP_PATTERNS) | set(ri.EMAIL_CLIENT_PATTERNS)
+    mapped |= {platform for platform, _ in ri.CLICK_ID_TO_PLATFORM.values()}
+    mapped |= {platform for platform, _ in ri.DOMAIN_TO_PLATFORM.values()}
+    assert mapped <= set(ri.SOURCE_PLATFORMS)
+
+
+def test_codes_on_click():
+    intel = analyze_click(user_agent=None, referer="https://l.instagram.com/", accept_language=None)
+    assert intel.source_platform_id == ri.SOURCE_PLATFORMS.index("instagram") + 1
+    assert intel.source_medium_id == ri.SOURCE_MEDIUMS.index("social") + 1
+    assert intel.device_class_id == ri.DEVICE_CLASSES.index("unknown") + 1
+
+
+def test_open_ended_value_has_no_code():
+    assert ClickIntelligence(source_platform="my_newsletter_2026").source_platform_id is None
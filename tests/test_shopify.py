@@ -9,48 +9,88 @@ from unittest.mock import AsyncMock, MagicMock, patch
 from uuid import uuid4
 
 import pytest
+from starlette.requests import Request
 
 from app.api.shopify import (
     _extract_click_id_from_note_attributes,
     _shopify_money_to_cents,
-    _verify_shopify_hmac,
+    _read_signed_body,
+    _store_cache,
 )
 from app.core.click_id import mint_click_id
 
 
+@pytest.fixture(autouse=True)
+def _clear_store_cache():
+    # Each test mocks its own store lookup
+    _store_cache.clear()
+
+
 # ---------------------------------------------------------------------------
-# Helper: _verify_shopify_hmac
+# Helper: _read_signed_body
 # ---------------------------------------------------------------------------
 
-class TestVerifyShopifyHmac:
-    def _sign(self, body: bytes, secret: str) -> str:
+def _webhook_request(chunks: list[bytes], hmac_header: bytes | None) -> Request:
+    """A Request whose body arrives in `chunks`, as the ASGI server sends it."""
+    messages = [
+        {"type": "http.request", "body": chunk, "more_body": i < len(chunks) - 1}
+        for i, chunk in enumerate(chunks)
+    ]
+
+    async def receive():
+        return messages.pop(0)
+
+    headers = [(b"x-shopify-hmac-sha256", hmac_header)] if hmac_header is not None else []
+    return Request({"type": "http", "method": "POST", "headers": headers}, receive)
+
+
+class TestReadSignedBody:
+    def _sign(self, body: bytes, secret: str) -> bytes:
         digest = hmac_mod.new(secret.encode(), body, hashlib.sha256).digest()
-        return base64.b64encode(digest).decode()
+        return base64.b64encode(digest)
 
-    def test_valid_hmac_accepted(self):
+    async def test_valid_hmac_accepted(self):
         secret = "my-webhook-secret"
         body = b'{"id": 123}'
-        sig = self._sign(body, secret)
-        assert _verify_shopify_hmac(body, secret, sig) is True
-
-    def test_wrong_secret_rejected(self):
-        body = b'{"id": 123}'
-        sig = self._sign(body, "correct-secret")
-        assert _verify_shopify_hmac(body, "wrong-secret", sig) is False
+        request = _webhook_request([body], self._sign(body, secret))
+        assert await _read_signed_body(request, secret) == (body, True)
 
-    def test_tampered_body_rejected(self):
+    async def test_chunked_body_hashed_as_a_whole(self):
         secret = "my-webhook-secret"
-        sig = self._sign(b'{"id": 123}', secret)
-        assert _verify_shopify_hmac(b'{"id": 999}', secret, sig) is False
+        body = b'{"id": 123, "line_items": []}'
+        request = _webhook_request([body[:5], body[5:17], body[17:]], self._sign(body, secret))
+        assert await _read_signed_body(request, secret) == (body, True)
 
-    def test_empty_hmac_header_rejected(self):
+    async def test_wrong_secret_rejected(self):
         body = b'{"id": 123}'
-        assert _verify_shopify_hmac(body, "secret", "") is False
+        request = _webhook_request([body], self._sign(body, "correct-secret"))
+        assert await _read_signed_body(request, "wrong-secret") == (body, False)
 
-    def test_empty_body(self):
+    async def test_tampered_body_rejected(self):
+        secret = "my-webhook-secret"
+        request = _webhook_request([b'{"id": 999}'], self._sign(b'{"id": 123}', secret))
+        _, signed = await _read_signed_body(request, secret)
+        assert signed is False
+
+    async def test_missing_hmac_header_rejected(self):
+        request = _webhook_request([b'{"id": 123}'], None)
+        _, signed = await _read_signed_body(request, "secret")
+        assert signed is False
+
+    async def test_empty_hmac_header_rejected(self):
+        request = _webhook_request([b'{"id": 123}'], b"")
+        _, signed = await _read_signed_body(request, "secret")
+        assert signed is False
+
+    async def test_non_ascii_hmac_header_rejected(self):
+        request = _webhook_request([b'{"id": 123}'], "sïgnature".encode("latin-1"))
+        _, signed = await _read_signed_body(request, "secret")
+        assert signed is False
+
+    async def test_empty_body(self):
         secret = "s"
-        sig = self._sign(b"", secret)
-        assert _verify_shopify_hmac(b"", secret, sig) is True
+        request = _webhook_request([b""], self._sign(b"", secret))
+        assert await _read_signed_body(request, secret) == (b"", True)
 
 
 # ---------------------------------------------------------------------------
@@ -113,6 +153,15 @@ class TestShopifyMoneyToCents:
     def test_single_cent(self):
         assert _shopify_money_to_cents("0.01") == 1
 
+    def test_one_decimal_place(self):
+        assert _shopify_money_to_cents("29.9") == 2990
+
+    def test_negative_amount(self):
+        assert _shopify_money_to_cents("-5.25") == -525
+
+    def test_extra_precision_rounds(self):
+        assert _shopify_money_to_cents("10.999") == 1100
+
     def test_invalid_string_returns_zero(self):
         assert _shopify_money_to_cents("not-a-number") == 0
 
@@ -301,6 +350,28 @@ class TestWebhookOrdersCreate:
         )
         assert resp.status_code == 401
 
+    def test_malformed_json_returns_400(self):
+        body_bytes = b'{"id": 5551234, "note_attributes": ['
+
+        mock_db = AsyncMock()
+        store_result = MagicMock()
+        store_result.scalar_one_or_none.return_value = self.store
+        mock_db.execute = AsyncMock(return_value=store_result)
+
+        from app.models.database import get_db
+        self.app.dependency_overrides[get_db] = lambda: mock_db
+
+        resp = self.client.post(
+            "/v1/shopify/webhooks/orders-create",
+            content=body_bytes,
+            headers={
+                "X-Shopify-Shop-Domain": self.store.shop_domain,
+                "X-Shopify-Hmac-Sha256": _make_hmac(body_bytes, self.secret),
+                "Content-Type": "application/json",
+            },
+        )
+        assert resp.status_code == 400
+
     def test_organic_order_no_click_id_ignored(self):
         order = _make_order_body(click_id=None)
         resp, _ = self._post_order(order)
@@ -341,6 +412,15 @@ class TestWebhookOrdersCreate:
         assert event.currency == "CAD"
 
 
+def _conversion_row(store, duplicate=False):
+    """Row from the refund webhook's conversion + already-refunded lookup."""
+    row = MagicMock()
+    row.click_id = "test-click-id"
+    row.organization_id = store.organization_id
+    row.duplicate = duplicate
+    return row
+
+
 class TestWebhookOrdersRefund:
     """Test POST /v1/shopify/webhooks/orders-refund"""
 
@@ -370,15 +450,9 @@ class TestWebhookOrdersRefund:
             store_result.scalar_one_or_none.return_value = store
 
             conv_result = MagicMock()
-            conv_mock = MagicMock()
-            conv_mock.click_id = "test-click-id"
-            conv_mock.organization_id = store.organization_id
-            conv_result.scalar_one_or_none.return_value = conv_mock
-
-            no_dup_result = MagicMock()
-            no_dup_result.scalar_one_or_none.return_value = None
+            conv_result.one_or_none.return_value = _conversion_row(store)
 
-            mock_db.execute = AsyncMock(side_effect=[store_result, conv_result, no_dup_result])
+            mock_db.execute = AsyncMock(side_effect=[store_result, conv_result])
 
         mock_db.commit = AsyncMock()
         mock_db.add = MagicMock()
@@ -417,7 +491,7 @@ class TestWebhookOrdersRefund:
         store_result.scalar_one_or_none.return_value = self.store
 
         conv_result = MagicMock()
-        conv_result.scalar_one_or_none.return_value = None  # no conversion
+        conv_result.one_or_none.return_value = None  # no conversion
 
         resp, mock_db = self._post_refund(refund, db_mocks=[store_result, conv_result])
 
@@ -432,17 +506,9 @@ class TestWebhookOrdersRefund:
         store_result.scalar_one_or_none.return_value = self.store
 
         conv_result = MagicMock()
-        conv_mock = MagicMock()
-        conv_mock.click_id = "test-click-id"
-        conv_mock.organization_id = self.store.organization_id
-        conv_result.scalar_one_or_none.return_value = conv_mock
-
-        dup_result = MagicMock()
-        dup_result.scalar_one_or_none.return_value = MagicMock()  # existing refund
+        conv_result.one_or_none.return_value = _conversion_row(self.store, duplicate=True)
 
-        resp, mock_db = self._post_refund(
-            refund, db_mocks=[store_result, conv_result, dup_result]
-        )
+        resp, mock_db = self._post_refund(refund, db_mocks=[store_result, conv_result])
 
         assert resp.status_code == 200
         assert resp.json()["status"] == "duplicate"
@@ -550,20 +616,16 @@ class TestFullFlow:
 
         mock_db2 = AsyncMock(spec=["execute", "add", "commit", "flush"])
 
-        store_result2 = MagicMock()
-        store_result2.scalar_one_or_none.return_value = self.store
-
-        # Return the conversion from step 1
+        # Return the conversion from step 1, not yet refunded
         conv_result = MagicMock()
-        conv_mock = MagicMock()
-        conv_mock.click_id = valid_click_id
-        conv_mock.organization_id = org_id
-        conv_result.scalar_one_or_none.return_value = conv_mock
-
-        no_dup2 = MagicMock()
-        no_dup2.scalar_one_or_none.return_value = None
-
-        mock_db2.execute = AsyncMock(side_effect=[store_result2, conv_result, no_dup2])
+        conv_row = MagicMock()
+        conv_row.click_id = valid_click_id
+        conv_row.organization_id = org_id
+        conv_row.duplicate = False
+        conv_result.one_or_none.return_value = conv_row
+
+        # Store comes from the webhook store cache warmed by step 1
+        mock_db2.execute = AsyncMock(side_effect=[conv_result])
         mock_db2.commit = AsyncMock()
         mock_db2.add = MagicMock()
 